@@ -1,16 +1,131 @@
 import streamlit as st
 import os
 import base64
-from wechat_scraper import WeChatScraper
 from auth_helper import init_login_driver, get_login_qr, check_login_status, save_credentials, load_credentials, clear_credentials
 import time
+import json
 import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import tempfile
-import shutil
+import uuid
+from urllib.parse import quote
+from job_runner import shared_runner, QUEUED, RUNNING, FAILED, CANCELLED, DOWNLOAD_DIR
+from metrics import start_metrics_server
+from archive_server import start_archive_server, static_servable, DEFAULT_DOWNLOAD_PORT
+import progress_events as events
+
+# While a job runs, the page redraws from its progress events at most every REDRAW_INTERVAL seconds
+# and only when something changed; the whole script reruns every RERUN_INTERVAL seconds.
+REDRAW_INTERVAL = 0.5
+RERUN_INTERVAL = 15
+LISTING_STOP_REASONS = {
+    "rate_limit": "❌ 限制未解除，请休息 1-24 小时后再试。",
+    "no_login": "❌ 没有可用的登录，请重新扫码。",
+    "error": "❌ 获取文章列表出错。",
+}
+FORMAT_LABELS = {"html": "HTML", "pdf": "PDF", "docx": "Word"}
+
+# Stage names shown in the job summary
+STAGE_LABELS = [
+    ("listing", "列表"), ("article_fetch", "文章"), ("image_fetch", "图片"), ("parse", "解析"),
+    ("docx_build", "Word"), ("pdf_render", "PDF"), ("throttle_wait", "限速等待"),
+]
+
+
+def describe_event(event):
+    """One display line for a progress event (see progress_events), or None to leave it out."""
+    kind = event['kind']
+    if kind == events.SEARCH: return f"🔍 正在搜索: {event['name']}..."
+    if kind == events.ACCOUNT_FOUND: return "✅ 找到公众号！"
+    if kind == events.ACCOUNT_NOT_FOUND: return "❌ 未找到公众号"
+    if kind == events.PAGE: return f"📄 获取列表 (第 {event['page']} 页)..."
+    if kind == events.RATE_LIMITED: return f"⚠️ 触发频率限制，自动降速并暂停 {event['penalty']:.0f} 秒..."
+    if kind == events.LISTING_STOPPED: return LISTING_STOP_REASONS.get(event['reason'])
+    if kind == events.ARTICLE_SKIPPED: return f"⏭️ 跳过: {event['title']}"
+    if kind == events.ARTICLE_DONE:
+        return f"⬇️ 下载成功: {event['title']}" if event['success'] else f"❌ 下载失败: {event['title']}"
+    if kind == events.FORMAT_FAILED: return f"⚠️ {FORMAT_LABELS.get(event['format'], event['format'])} 生成失败: {event['title']}"
+    if kind == events.ERROR: return f"❌ {event['message']}"
+    return None
+
+
+def describe_article(state):
+    """Progress line for an article that is being downloaded right now."""
+    line = f"  ▸ {state['title']}"
+    if state['images_total']:
+        line += f" | 图片 {state['images_done']}/{state['images_total']}"
+    elif state['stage'] == "fetch":
+        line += " | 获取正文..."
+    if state['formats_done']:
+        line += " | 已生成 " + " ".join(FORMAT_LABELS.get(fmt, fmt) for fmt in state['formats_done'])
+    return line
+
+
+def render_progress(snap, status_text, progress_bar, log_container):
+    """Draw a queued/running job's status line, progress bar and event log."""
+    progress = snap['progress']
+    lines = [line for line in (describe_event(event) for event in progress['recent']) if line]
+    lines = lines[-6:] + [describe_article(state) for state in progress['in_flight']]
+    if lines:
+        log_container.code("\n".join(lines), language="bash")
+    
+    if snap['status'] != RUNNING:
+        return
+    if snap['listed'] == 0 and snap['processed'] == 0:
+        status_text.info(f"正在获取文章列表: {snap['account']}... (第 {progress['pages'] or 1} 页)")
+    elif snap['listing_done']:
+        status_text.text(f"正在处理 {snap['processed']}/{snap['listed']}: {snap['current'] or ''}")
+    else:
+        status_text.text(f"已获取 {snap['listed']} 篇 (列表获取中...) | 已处理 {snap['processed']}: {snap['current'] or ''}")
+    if progress['rate_limited_for']:
+        status_text.warning(f"⚠️ 触发频率限制，{progress['rate_limited_for']:.0f} 秒后继续...")
+    
+    # Articles in flight count by their image progress, so the bar moves inside long articles too
+    partial = sum(
+        state['images_done'] / (state['images_total'] + 1) for state in progress['in_flight'] if state['images_total']
+    )
+    progress_bar.progress(min((snap['processed'] + partial) / max(snap['listed'], 1), 1.0))
+
+
+@st.cache_resource(show_spinner=False)
+def metrics_endpoint(port):
+    """Prometheus endpoint for all jobs of this server process (started once, when METRICS_PORT is set)."""
+    return start_metrics_server(port)
+
+
+@st.cache_resource(show_spinner=False)
+def archive_endpoint(port):
+    """Streaming endpoint for finished ZIPs (no size cap, application/zip); None if the port is unavailable."""
+    os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+    try:
+        return start_archive_server(DOWNLOAD_DIR, port)
+    except OSError as e:
+        print(f"Error starting archive download server on port {port}: {e}")
+        return None
+
+
+def archive_url(server, zip_name, filename):
+    """
+    Browser URL of an archive on the streaming endpoint. DOWNLOAD_BASE_URL overrides the default of
+    the page's own host on the endpoint's port (e.g. behind a reverse proxy).
+    """
+    base_url = os.environ.get("DOWNLOAD_BASE_URL")
+    if not base_url:
+        host = "localhost"
+        try:
+            from streamlit.web.server.websocket_headers import _get_websocket_headers
+            headers = _get_websocket_headers() or {}
+            host = headers.get("Host", host).rsplit(":", 1)[0]
+        except ImportError:
+            pass
+        base_url = f"http://{host}:{server.server_address[1]}"
+    return f"{base_url.rstrip('/')}/{zip_name}?name={quote(filename)}"
+
 
 st.set_page_config(page_title="微信公众号文章下载工具", page_icon="⚡", layout="wide")
 
+# Must come after set_page_config, which has to be the first Streamlit call of the script
+if os.environ.get("METRICS_PORT"):
+    metrics_endpoint(int(os.environ["METRICS_PORT"]))
+
 # --- Tech Theme CSS (Apple Style + White Text) ---
 st.markdown("""
 <style>
@@ -42,6 +157,18 @@ st.markdown("""
         transform: scale(1.02);
     }
     
+    /* ZIP download link styled like the buttons */
+    a.zip-download {
+        display: block;
+        text-align: center;
+        border-radius: 980px;
+        background-color: #0071e3;
+        color: white !important;
+        font-weight: 500;
+        padding: 0.6rem 1.2rem;
+        text-decoration: none;
+    }
+    
     /* Sidebar Background */
     [data-testid="stSidebar"] {
         background-color: #000000; /* Match main background */
@@ -163,7 +290,7 @@ with st.sidebar:
     4.  **启动**: 点击 **“开始下载”**，程序将自动抓取并保存至 **下载** 文件夹。
     
     ### ⚠️ 注意事项
-    *   **频率限制**: 如果出现黄色警告，说明触发了微信的频率控制，程序会自动暂停 60 秒。解决方案可以更换微信号扫码登录重新下载。
+    *   **频率限制**: 如果出现黄色警告，说明触发了微信的频率控制，程序会自动降低请求速度并逐步延长暂停时间后重试。可以点击 **“添加账号”** 再扫码登录其他微信号，程序会自动轮换使用。
     """)
 
 # --- Main Layout ---
@@ -187,25 +314,34 @@ with main_col:
             st.session_state['token'] = ''
             
     if 'token' not in st.session_state: st.session_state['token'] = ''
+    # Logins this session may spend on listing requests: the one it started with plus any added here
+    if 'logins' not in st.session_state:
+        st.session_state['logins'] = [(st.session_state['cookie'], st.session_state['token'])] if st.session_state['token'] else []
     
-    # Use temporary directory for downloads in serverless environment
-    if 'base_dir' not in st.session_state:
-        st.session_state['temp_dir_obj'] = tempfile.TemporaryDirectory()
-        st.session_state['base_dir'] = st.session_state['temp_dir_obj'].name
-    
-    base_dir = st.session_state['base_dir']
-
     # --- 1. Login Section ---
-    if st.session_state['cookie'] and st.session_state['token']:
+    if 'adding_account' not in st.session_state: st.session_state['adding_account'] = False
+    logged_in = bool(st.session_state['cookie'] and st.session_state['token'])
+    
+    if logged_in:
         # Logged In State
-        st.success("✅ 已登录 | 凭证有效")
-        if st.button("🔄 切换账号 / 退出登录"):
-            clear_credentials()
-            st.session_state['cookie'] = ''
-            st.session_state['token'] = ''
-            st.rerun()
-    else:
-        # Not Logged In State
+        login_count = max(len(st.session_state['logins']), 1)
+        st.success(f"✅ 已登录 | 凭证有效 | 可用账号: {login_count}")
+        c_add, c_out = st.columns(2)
+        with c_add:
+            if st.button("➕ 添加账号 (分摊频率限制)", help="多个微信号轮流获取文章列表，一个账号被限制时自动切换"):
+                st.session_state['adding_account'] = True
+                st.rerun()
+        with c_out:
+            if st.button("🔄 切换账号 / 退出登录"):
+                clear_credentials()
+                st.session_state['cookie'] = ''
+                st.session_state['token'] = ''
+                st.session_state['logins'] = []
+                st.session_state['adding_account'] = False
+                st.rerun()
+            
+    if not logged_in or st.session_state['adding_account']:
+        # Not Logged In State (or adding another login to the pool)
         if 'login_driver' not in st.session_state: st.session_state['login_driver'] = None
         
         if not st.session_state['login_driver']:
@@ -250,6 +386,8 @@ with main_col:
                     save_credentials(cookie, token)
                     st.session_state['cookie'] = cookie
                     st.session_state['token'] = token
+                    st.session_state['logins'] = [(c, t) for c, t in st.session_state['logins'] if t != token] + [(cookie, token)]
+                    st.session_state['adding_account'] = False
                     
                     # Cleanup
                     st.session_state['login_driver'].quit()
@@ -266,6 +404,7 @@ with main_col:
             if st.button("取消登录"):
                 st.session_state['login_driver'].quit()
                 st.session_state['login_driver'] = None
+                st.session_state['adding_account'] = False
                 if 'qr_img' in st.session_state: del st.session_state['qr_img']
                 st.rerun()
 
@@ -279,13 +418,18 @@ with main_col:
 
     # Formats
     st.caption("选择导出格式:")
-    f1, f2 = st.columns(2)
+    f1, f2, f3 = st.columns(3)
     with f1: fmt_docx = st.checkbox("Word（图文）", value=True, help="推荐！包含文字和图片")
     with f2: fmt_pdf = st.checkbox("PDF (打印版)", value=False, help="完美还原网页排版")
+    with f3: fmt_html = st.checkbox("HTML (离线网页)", value=False, help="图片统一保存在 HTML/assets 文件夹，体积更小")
 
     formats = []
     if fmt_docx: formats.append('docx')
     if fmt_pdf: formats.append('pdf')
+    if fmt_html: formats.append('html')
+
+    use_async = st.checkbox("异步下载引擎 (实验)", value=False, help="所有文章的图片共享一个并发调度器，适合图片较多的公众号")
+    offline = st.checkbox("仅从本地缓存导出 (不联网)", value=False, help="用之前下载过的文章重新生成其他格式，不消耗访问次数")
 
     st.markdown("<br>", unsafe_allow_html=True)
     
@@ -314,121 +458,152 @@ with main_col:
         date_range = None # All history
 
     # --- 3. Action & Output ---
+    # Downloads run on the shared job runner, outside this script run: reruns, reloads and other
+    # sessions don't interrupt them, and the page just polls the job's progress.
+    runner = shared_runner()
+    # Jobs belong to this browser session rather than a login, so adding or switching logins keeps them;
+    # the id also goes into the URL (?owner=) so a reload finds them again
+    if 'owner' not in st.session_state:
+        st.session_state['owner'] = st.query_params.get("owner") or uuid.uuid4().hex
+    owner = st.session_state['owner']
+    if st.query_params.get("owner") != owner:
+        st.query_params["owner"] = owner
+    
     if st.button("⚡ 开始下载", type="primary"):
         if not st.session_state['cookie'] or not st.session_state['token']:
             st.error("❌ 请先登录！")
         elif not account_name:
             st.error("❌ 请输入公众号名称！")
         else:
-            # Create target directory
-            target_dir = os.path.join(base_dir, account_name)
-            if not os.path.exists(target_dir):
-                try:
-                    os.makedirs(target_dir)
-                except Exception as e:
-                    st.error(f"❌ 无法创建文件夹: {e}")
-                    st.stop()
+            # Handle date range input
+            search_date_range = None
+            if isinstance(date_range, tuple) and len(date_range) == 2:
+                search_date_range = date_range
             
-            # Initialize Scraper
-            scraper = WeChatScraper(st.session_state['cookie'], st.session_state['token'])
+            credentials = [(st.session_state['cookie'], st.session_state['token'])] + st.session_state['logins']
+            job_id = runner.submit(owner, account_name, formats, search_date_range, credentials,
+                                   use_async=use_async, offline=offline)
+            st.session_state['job_id'] = job_id
+            st.query_params["job"] = job_id
+    
+    # Reattach after a reload: session state first, then the ?job= URL parameter, then this session's newest job
+    job = None
+    if owner:
+        job_id = st.session_state.get('job_id') or st.query_params.get("job")
+        job = runner.get(job_id) if job_id else None
+        if job is None or job.owner != owner:
+            owner_jobs = runner.jobs_for(owner)
+            job = owner_jobs[0] if owner_jobs else None
+    
+    if job:
+        snap = job.snapshot()
+        job_account = snap['account']
+        
+        # Progress Container
+        status_container = st.container()
+        with status_container:
+            status_text = st.empty()
+            progress_bar = st.progress(0)
+            log_container = st.empty()
+        
+        render_progress(snap, status_text, progress_bar, log_container)
+        
+        if snap['status'] == QUEUED:
+            position = runner.queue_position(snap['id'])
+            status_text.info(f"⏳ 排队中，前面还有 {position or 0} 个任务...")
+            if st.button("⏹️ 取消任务"):
+                runner.cancel(snap['id'])
+                st.rerun()
+            time.sleep(1)
+            st.rerun()
+        
+        elif snap['status'] == RUNNING:
+            if st.button("⏹️ 停止任务", help="当前正在下载的文章完成后停止"):
+                runner.cancel(snap['id'])
+                st.rerun()
+            # Redraw just the progress placeholders, only when new events arrived and at most every
+            # REDRAW_INTERVAL; a click on the stop button interrupts this loop with a rerun
+            version = snap['progress']['version']
+            deadline = time.time() + RERUN_INTERVAL
+            while job.active and time.time() < deadline:
+                if job.progress.wait_for_change(version, REDRAW_INTERVAL) is not None:
+                    snap = job.snapshot()
+                    version = snap['progress']['version']
+                    render_progress(snap, status_text, progress_bar, log_container)
+                    time.sleep(REDRAW_INTERVAL)
+            st.rerun()
+        
+        elif snap['status'] == CANCELLED:
+            status_text.warning(f"⏹️ 任务已取消。下载: {snap['downloaded']}, 跳过: {snap['skipped']}")
+        
+        elif snap['error'] == 'account_not_found':
+            st.error("❌ 未找到公众号，请检查名称或凭证。")
+        
+        elif snap['status'] == FAILED:
+            st.error(f"❌ 任务失败: {snap['error']}")
+        
+        elif snap['listed'] == 0:
+            st.warning("⚠️ 未找到任何文章。")
+        
+        else:
+            progress_bar.progress(1.0)
+            celebrated = st.session_state.setdefault('celebrated_jobs', set())
+            if snap['id'] not in celebrated:
+                celebrated.add(snap['id'])
+                st.balloons()
+            status_text.success(f"🎉 任务完成！下载: {snap['downloaded']}, 跳过: {snap['skipped']}")
             
-            # Progress Container
-            status_container = st.container()
-            with status_container:
-                status_text = st.empty()
-                progress_bar = st.progress(0)
-                log_container = st.empty()
+            result = snap['result']
+            if result and os.path.exists(result['zip_path']):
+                zip_filename = f"{job_account}_articles.zip"
+                zip_label = f"📦 打包下载所有文章 (ZIP, {result['zip_size'] / 1024 / 1024:.1f} MB)"
+                # Streamed from disk by the archive endpoint; Streamlit's static handler only as a fallback,
+                # since it refuses files over 200 MB
+                server = archive_endpoint(int(os.environ.get("DOWNLOAD_PORT", DEFAULT_DOWNLOAD_PORT)))
+                if server is not None:
+                    zip_href = archive_url(server, result['zip_name'], zip_filename)
+                elif static_servable(result['zip_path']):
+                    zip_href = result['zip_url']
+                else:
+                    zip_href = None
+                if zip_href:
+                    st.markdown(
+                        f'<a href="{zip_href}" download="{zip_filename}" class="zip-download">{zip_label}</a>',
+                        unsafe_allow_html=True
+                    )
+                else:
+                    # Last resort: the session holds the whole file while the button is shown
+                    with open(result['zip_path'], 'rb') as f:
+                        st.download_button(zip_label, f, file_name=zip_filename, mime="application/zip")
             
-            logs = []
-            def update_log(msg):
-                # Translate common logs
-                if "Searching for" in msg: msg = f"🔍 正在搜索: {account_name}..."
-                if "Found Account" in msg: msg = "✅ 找到公众号！"
-                if "Fetching page" in msg: msg = f"📄 获取列表 (第 {msg.split(' ')[2]} 页)..."
-                if "Downloaded:" in msg: msg = f"⬇️ 下载成功: {msg.split(': ')[1]}"
-                if "Skip" in msg: msg = f"⏭️ 跳过: {msg.split(': ')[1]}"
-                if "Rate limit detected" in msg: msg = "⚠️ 触发频率限制，暂停 60 秒..."
-                if "Rate limit persists" in msg: msg = "❌ 限制未解除，请休息 1-24 小时后再试。"
+            if result:
+                st.info(f"📂 文件临时保存于: {result['target_dir']}")
                 
-                logs.append(msg)
-                log_text = "\n".join(logs[-6:])
-                log_container.code(log_text, language="bash")
+                conn_stats = result['connections']
+                st.caption(f"🔗 HTTP 请求: {conn_stats['requests']}, 新建连接: {conn_stats['connections_opened']}, 复用连接: {conn_stats['connections_reused']}")
+                st.caption(f"🚦 限速等待: {result['throttled_seconds']:.0f} 秒, 参与账号: {result['logins']}")
+                img_stats = result['image_store']
+                if img_stats:
+                    st.caption(f"🖼️ 图片缓存命中: {img_stats['hits']}, 未命中: {img_stats['misses']}, 节省流量: {img_stats['bytes_saved'] / 1024 / 1024:.1f} MB")
+                norm_stats = result.get('image_normalizer')
+                if norm_stats and norm_stats['images']:
+                    st.caption(f"🗜️ 图片压缩: 缩小 {norm_stats['downscaled']} 张, 转换格式 {norm_stats['transcoded']} 张, 节省 {norm_stats['bytes_saved'] / 1024 / 1024:.1f} MB")
             
-            # 1. Get FakeID
-            status_text.info("正在搜索公众号...")
-            fakeid = scraper.get_fakeid(account_name, update_log)
-            
-            if fakeid:
-                # 2. Get Articles
-                status_text.info("正在获取文章列表...")
-                
-                # Handle date range input
-                search_date_range = None
-                if isinstance(date_range, tuple) and len(date_range) == 2:
-                    search_date_range = date_range
-                
-                articles = scraper.get_articles(fakeid, update_log, date_range=search_date_range)
-                
-                total = len(articles)
-                if total == 0:
-                    st.warning("⚠️ 未找到任何文章。")
-                else:
-                    status_text.success(f"✅ 找到 {total} 篇，开始下载...")
-                    
-                    # 3. Download (Multi-threaded)
-                    downloaded_count = 0
-                    skipped_count = 0
-                    
-                    # Define a wrapper function for the executor
-                    def download_task(article):
-                        # Pass None as callback to avoid threading issues with Streamlit
-                        return scraper.save_article_content(article, target_dir, formats, callback=None)
-                    
-                    with ThreadPoolExecutor(max_workers=4) as executor:
-                        # Submit all tasks
-                        future_to_article = {executor.submit(download_task, article): article for article in articles}
-                        
-                        for i, future in enumerate(as_completed(future_to_article)):
-                            article = future_to_article[future]
-                            try:
-                                success = future.result()
-                                if success:
-                                    downloaded_count += 1
-                                    update_log(f"⬇️ 下载成功: {article['title']}")
-                                else:
-                                    skipped_count += 1
-                                    update_log(f"⏭️ 跳过/失败: {article['title']}")
-                            except Exception as exc:
-                                update_log(f"⚠️ 下载出错 {article['title']}: {exc}")
-                                skipped_count += 1
-                                
-                            # Update progress
-                            status_text.text(f"正在处理 {i+1}/{total}: {article['title']}")
-                            progress_bar.progress((i + 1) / total) 
-                    
-                    st.balloons()
-                    status_text.success(f"🎉 任务完成！下载: {downloaded_count}, 跳过: {skipped_count}")
-                    
-                    # Create ZIP file
-                    shutil.make_archive(os.path.join(base_dir, "articles"), 'zip', target_dir)
-                    zip_path = os.path.join(base_dir, "articles.zip")
-                    
-                    with open(zip_path, "rb") as f:
-                        st.download_button(
-                            label="📦 打包下载所有文章 (ZIP)",
-                            data=f,
-                            file_name=f"{account_name}_articles.zip",
-                            mime="application/zip",
-                            type="primary"
-                        )
-                    
-                    st.info(f"📂 文件临时保存于: {target_dir}")
-                    
-                    # Cleanup
-                    scraper.close_driver()
-                    
-            else:
-                st.error("❌ 未找到公众号，请检查名称或凭证。")
+            metrics = snap['metrics']
+            if metrics:
+                stages = metrics['stages']
+                timings = [f"{label} {stages[stage]['total_s']:.1f}s" for stage, label in STAGE_LABELS if stage in stages]
+                st.caption(f"⏱️ 耗时: {', '.join(timings)}")
+                counters = metrics['counters']
+                failed_images = counters.get('images_failed', 0) + counters.get('images_embed_failed', 0)
+                if failed_images:
+                    st.caption(f"⚠️ 图片失败: {failed_images} 张")
+                st.download_button(
+                    "📊 下载任务报告 (JSON)",
+                    json.dumps(metrics, ensure_ascii=False, indent=2),
+                    file_name=f"{job_account}_report.json",
+                    mime="application/json"
+                )
 
 with brand_col:
     # --- Branding (Right Column) ---
@@ -0,0 +1,67 @@
+import os
+import re
+import shutil
+import threading
+from urllib.parse import urlsplit, parse_qs, quote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Streamlit's static file handler answers 404 above this size (MAX_APP_STATIC_FILE_SIZE)
+# and serves .zip as text/plain, so archives are streamed from their own endpoint instead
+MAX_STATIC_FILE_SIZE = 200 * 1024 * 1024
+DEFAULT_DOWNLOAD_PORT = 8502
+STREAM_CHUNK = 1024 * 1024
+
+# Archive names are generated by the job runner (secrets.token_urlsafe); nothing else is served
+ARCHIVE_NAME = re.compile(r"^[A-Za-z0-9_-]+\.zip$")
+
+
+def static_servable(path):
+    """True if Streamlit's static handler can serve the file (it refuses anything over its size cap)."""
+    return os.path.getsize(path) <= MAX_STATIC_FILE_SIZE
+
+
+def start_archive_server(root, port=DEFAULT_DOWNLOAD_PORT, host="0.0.0.0"):
+    """
+    Stream finished archives from root at http://host:port/<archive name>?name=<download filename>,
+    in chunks and with no size cap, as application/zip. Returns the server (server_address has the port).
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_HEAD(self):
+            self._serve(send_body=False)
+
+        def do_GET(self):
+            self._serve(send_body=True)
+
+        def _serve(self, send_body):
+            parts = urlsplit(self.path)
+            archive_name = parts.path.lstrip("/")
+            if not ARCHIVE_NAME.match(archive_name):
+                self.send_error(404)
+                return
+            try:
+                f = open(os.path.join(root, archive_name), "rb")
+            except OSError:
+                self.send_error(404)
+                return
+            with f:
+                filename = parse_qs(parts.query).get("name", [archive_name])[0]
+                self.send_response(200)
+                self.send_header("Content-Type", "application/zip")
+                self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+                self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{quote(filename)}")
+                self.end_headers()
+                if send_body:
+                    try:
+                        shutil.copyfileobj(f, self.wfile, STREAM_CHUNK)
+                    except (BrokenPipeError, ConnectionResetError):
+                        # Browser cancelled the download
+                        pass
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
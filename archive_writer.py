@@ -0,0 +1,82 @@
+import os
+import zipfile
+import threading
+
+from download_manifest import MANIFEST_FILE, JOURNAL_SUFFIX
+
+# Formats that are already compressed internally (DOCX is a ZIP, PDF streams are deflated, images are encoded);
+# deflating them again costs CPU for almost no size gain, so they are stored as-is
+STORED_EXTENSIONS = {".docx", ".pdf", ".zip", ".jpg", ".jpeg", ".png", ".gif", ".webp"}
+DEFAULT_COMPRESSLEVEL = 6
+
+
+class IncrementalZip:
+    """
+    ZIP archive of a target directory built while the job runs: each article's files are appended
+    as soon as they are written, so closing the archive at the end only sweeps in leftovers.
+    Written to a .part file and renamed on close, so a half-built archive is never served.
+    """
+
+    def __init__(self, zip_path, root_dir, store_compressed=True, compresslevel=DEFAULT_COMPRESSLEVEL):
+        self.zip_path = zip_path
+        self.root_dir = root_dir
+        self.store_compressed = store_compressed
+        self._tmp_path = f"{zip_path}.part"
+        self._lock = threading.Lock()
+        self._added = set()
+        self._zip = zipfile.ZipFile(self._tmp_path, "w", compression=zipfile.ZIP_DEFLATED,
+                                    compresslevel=compresslevel, allowZip64=True)
+
+        self.files = 0
+        self.stored = 0
+        self.bytes_in = 0
+
+    def _compress_type(self, filepath):
+        if self.store_compressed and os.path.splitext(filepath)[1].lower() in STORED_EXTENSIONS:
+            return zipfile.ZIP_STORED
+        return zipfile.ZIP_DEFLATED
+
+    def add(self, filepath):
+        """Append one file (path inside root_dir). Files already in the archive are ignored."""
+        arcname = os.path.relpath(filepath, self.root_dir)
+        compress_type = self._compress_type(filepath)
+        with self._lock:
+            if self._zip is None or arcname in self._added:
+                return False
+            self._zip.write(filepath, arcname, compress_type=compress_type)
+            self._added.add(arcname)
+            self.files += 1
+            self.bytes_in += os.path.getsize(filepath)
+            if compress_type == zipfile.ZIP_STORED:
+                self.stored += 1
+            return True
+
+    def add_tree(self):
+        """Add every file under root_dir not yet in the archive (outputs of earlier runs, for example)."""
+        for dirpath, dirnames, filenames in os.walk(self.root_dir):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename in (MANIFEST_FILE, MANIFEST_FILE + JOURNAL_SUFFIX) or filename.endswith(".part"):
+                    continue
+                self.add(os.path.join(dirpath, filename))
+
+    def close(self):
+        """Sweep in remaining files and publish the archive. Returns its path."""
+        self.add_tree()
+        with self._lock:
+            zf, self._zip = self._zip, None
+        if zf is not None:
+            zf.close()
+            os.replace(self._tmp_path, self.zip_path)
+        return self.zip_path
+
+    def abort(self):
+        with self._lock:
+            zf, self._zip = self._zip, None
+        if zf is not None:
+            zf.close()
+            os.remove(self._tmp_path)
+
+    def stats(self):
+        with self._lock:
+            return {"files": self.files, "stored": self.stored, "bytes_in": self.bytes_in}
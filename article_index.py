@@ -0,0 +1,141 @@
+import time
+import sqlite3
+import threading
+from datetime import datetime
+
+# Constants
+ARTICLE_INDEX_FILE = ".article_index.sqlite"
+FAKEID_TTL = 30 * 86400  # fakeids never change; the TTL only guards against renamed accounts
+
+
+def article_info(title, link, create_time, digest):
+    """Listing entry in the dict shape used throughout the scraper."""
+    return {
+        "title": title,
+        "link": link,
+        "create_time": create_time,
+        "date_str": datetime.fromtimestamp(create_time).strftime('%Y-%m-%d'),
+        "digest": digest
+    }
+
+
+class ArticleIndex:
+    """
+    Persistent per-account index of listing entries and the account name -> fakeid cache.
+    (What has been written where is tracked by each target directory's DownloadManifest.)
+    Coverage records how far back the index is known to be contiguous from the newest article,
+    so a re-sync can stop paging as soon as it reaches an already indexed article.
+    """
+
+    def __init__(self, path=ARTICLE_INDEX_FILE):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS articles (
+                fakeid TEXT NOT NULL,
+                link TEXT NOT NULL,
+                title TEXT NOT NULL,
+                create_time INTEGER NOT NULL,
+                digest TEXT,
+                PRIMARY KEY (fakeid, link)
+            );
+            CREATE INDEX IF NOT EXISTS articles_by_time ON articles (fakeid, create_time);
+            CREATE TABLE IF NOT EXISTS coverage (
+                fakeid TEXT PRIMARY KEY,
+                oldest_time INTEGER NOT NULL,
+                complete INTEGER NOT NULL,
+                synced_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS fakeids (
+                name TEXT PRIMARY KEY,
+                fakeid TEXT NOT NULL,
+                resolved_at REAL NOT NULL
+            );
+            DROP TABLE IF EXISTS downloads;
+        """)
+        self._db.commit()
+
+    def add(self, fakeid, msg_list):
+        """Store raw app_msg_list entries. Returns the number of articles not indexed before."""
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO articles (fakeid, link, title, create_time, digest) VALUES (?, ?, ?, ?, ?)",
+                [(fakeid, msg['link'], msg['title'], msg['create_time'], msg.get('digest', '')) for msg in msg_list]
+            )
+            self._db.commit()
+            return self._db.total_changes - before
+
+    def has(self, fakeid, link):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM articles WHERE fakeid = ? AND link = ?", (fakeid, link)
+            ).fetchone()
+            return row is not None
+
+    def articles(self, fakeid, date_range=None):
+        """Indexed articles for fakeid, newest first, optionally limited to (start_date, end_date)."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT title, link, create_time, digest FROM articles WHERE fakeid = ? ORDER BY create_time DESC",
+                (fakeid,)
+            ).fetchall()
+
+        result = []
+        for title, link, create_time, digest in rows:
+            if date_range:
+                start_date, end_date = date_range
+                msg_date = datetime.fromtimestamp(create_time).date()
+                if msg_date < start_date or msg_date > end_date:
+                    continue
+            result.append(article_info(title, link, create_time, digest))
+        return result
+
+    def coverage(self, fakeid):
+        """(oldest_create_time, complete) of the contiguous indexed range, or (None, False) if never synced."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT oldest_time, complete FROM coverage WHERE fakeid = ?", (fakeid,)
+            ).fetchone()
+        if not row:
+            return None, False
+        return row[0], bool(row[1])
+
+    def covers(self, fakeid, date_range=None):
+        """True if every article in date_range is already indexed."""
+        oldest_time, complete = self.coverage(fakeid)
+        if complete:
+            return True
+        if oldest_time is None or not date_range:
+            return False
+        return datetime.fromtimestamp(oldest_time).date() <= date_range[0]
+
+    def set_coverage(self, fakeid, oldest_time, complete):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO coverage (fakeid, oldest_time, complete, synced_at) VALUES (?, ?, ?, ?)",
+                (fakeid, oldest_time, int(complete), time.time())
+            )
+            self._db.commit()
+
+    def cached_fakeid(self, name, ttl=FAKEID_TTL):
+        """fakeid previously resolved for an account name, or None if unknown or older than ttl seconds."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT fakeid, resolved_at FROM fakeids WHERE name = ?", (name,)
+            ).fetchone()
+        if row and time.time() - row[1] <= ttl:
+            return row[0]
+        return None
+
+    def cache_fakeid(self, name, fakeid):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO fakeids (name, fakeid, resolved_at) VALUES (?, ?, ?)",
+                (name, fakeid, time.time())
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,142 @@
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+
+# Text tags that become blocks of the parsed article; images become blocks wherever they appear
+TEXT_TAGS = {'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+
+# Prefer the C-accelerated lxml backend; fall back to the pure-Python parser
+try:
+    import lxml  # noqa: F401
+    DEFAULT_PARSER = 'lxml'
+except ImportError:
+    DEFAULT_PARSER = 'html.parser'
+
+
+class Block:
+    """One piece of article content: a heading, a paragraph or an image."""
+
+    def __init__(self, kind, text=None, level=None, url=None):
+        self.kind = kind      # 'heading', 'paragraph' or 'image'
+        self.text = text
+        self.level = level    # Heading level 1-6
+        self.url = url        # Image source URL (key into ParsedArticle.images)
+
+
+class ParsedArticle:
+    """
+    Article parsed once and shared by every exporter.
+    soup is the full page (used for HTML/PDF), blocks is the ordered #js_content body (used for Word),
+    and images maps each image URL to its raw bytes, None or the exception raised while fetching it.
+    soup may be None for a copy handed to another process; text then holds the page's plain text.
+    """
+
+    def __init__(self, title, date_str, soup, blocks, images, has_content=True, text=None):
+        self.title = title
+        self.date_str = date_str
+        self.soup = soup
+        self.blocks = blocks
+        self.images = images
+        self.has_content = has_content
+        self.text = text
+
+    def image_data(self, url):
+        """Raw bytes for url, or None if the image could not be fetched."""
+        data = self.images.get(url)
+        if isinstance(data, BaseException):
+            return None
+        return data
+
+    def plain_text(self):
+        if self.soup is None:
+            return self.text or ""
+        return self.soup.get_text()
+
+
+def parse_page(page_html, parser=None, content_only=False):
+    """
+    Parse an article page with the given BeautifulSoup backend (default: lxml when installed).
+    content_only keeps just the #js_content subtree, skipping the page's large inline scripts and styles;
+    use it when no HTML-based format is requested. Falls back to the full page if #js_content is missing.
+    """
+    parser = parser or DEFAULT_PARSER
+    if content_only:
+        soup = BeautifulSoup(page_html, parser, parse_only=SoupStrainer(id="js_content"))
+        if soup.find(id="js_content"):
+            return soup
+    return BeautifulSoup(page_html, parser)
+
+
+def needs_full_page(formats):
+    """HTML and PDF render the whole page; Word only needs the #js_content body."""
+    return 'html' in formats or 'pdf' in formats
+
+
+def image_urls(soup):
+    """Image URLs referenced by the page, in document order."""
+    urls = []
+    for img in soup.find_all('img'):
+        img_url = img.get('data-src') or img.get('src')
+        if img_url:
+            urls.append(img_url)
+    return urls
+
+
+def _image_block(img):
+    img_url = img.get('data-src') or img.get('src')
+    if img_url:
+        return Block('image', url=img_url)
+    return None
+
+
+def extract_blocks(soup):
+    """
+    Ordered heading/paragraph/image blocks of the #js_content body. Returns None if it is missing.
+    Single pass in document order: a text tag emits its text followed by the images inside it,
+    and its subtree is not visited again, so nothing is emitted twice.
+    """
+    content_div = soup.find(id="js_content")
+    if not content_div:
+        return None
+
+    blocks = []
+    stack = [iter(content_div.children)]
+    while stack:
+        element = next(stack[-1], None)
+        if element is None:
+            stack.pop()
+            continue
+        if not isinstance(element, Tag):
+            continue
+
+        if element.name == 'img':
+            block = _image_block(element)
+            if block:
+                blocks.append(block)
+        elif element.name in TEXT_TAGS:
+            text = element.get_text(strip=True)
+            if text:
+                if element.name.startswith('h'):
+                    blocks.append(Block('heading', text=text, level=int(element.name[1])))
+                else:
+                    blocks.append(Block('paragraph', text=text))
+
+            # Images inside paragraphs (common in WeChat)
+            for img in element.find_all('img'):
+                block = _image_block(img)
+                if block:
+                    blocks.append(block)
+        else:
+            stack.append(iter(element.children))
+    return blocks
+
+
+def build_article(article, soup, images):
+    """Build the shared ParsedArticle from the parsed page and its fetched images."""
+    blocks = extract_blocks(soup)
+    return ParsedArticle(
+        article['title'],
+        article['date_str'],
+        soup,
+        blocks or [],
+        images,
+        has_content=blocks is not None
+    )
@@ -0,0 +1,229 @@
+import asyncio
+from urllib.parse import urlsplit
+import aiohttp
+from http_session import Deadline, DeadlineExceeded
+from article_model import parse_page, image_urls, build_article, needs_full_page
+import progress_events as events
+
+# Scheduler defaults: total in-flight fetches, per-host cap, and articles processed at once
+DEFAULT_MAX_FETCHES = 128
+DEFAULT_PER_HOST = 16
+DEFAULT_MAX_ARTICLES = 16
+
+
+class AsyncDownloadEngine:
+    """
+    Asyncio backend for WeChatScraper.save_article_content.
+    Image fetches of every in-flight article share one bounded scheduler with
+    per-host concurrency caps; parsing and file writing reuse the scraper's code
+    so the outputs are identical to the threaded path.
+    """
+
+    def __init__(self, scraper, max_fetches=DEFAULT_MAX_FETCHES, per_host=DEFAULT_PER_HOST,
+                 max_articles=DEFAULT_MAX_ARTICLES):
+        self.scraper = scraper
+        self.max_fetches = max_fetches
+        self.per_host = per_host
+        self.max_articles = max_articles
+
+    def run(self, articles, base_dir, formats=['html'], callback=None, on_result=None, cancel_event=None):
+        """
+        Blocking entry point. Downloads all articles and returns a list of success flags in input order.
+        on_result(article, success) is called from the calling thread as each article finishes.
+        Once cancel_event (threading.Event) is set, articles not yet started are skipped (flag None)
+        and the call returns when the ones in progress are done.
+        """
+        return asyncio.run(self.run_async(articles, base_dir, formats, callback, on_result, cancel_event))
+
+    async def run_async(self, articles, base_dir, formats=['html'], callback=None, on_result=None, cancel_event=None):
+        self._fetch_slots = asyncio.Semaphore(self.max_fetches)
+        self._host_slots = {}
+        self._in_flight = {}
+        article_slots = asyncio.Semaphore(self.max_articles)
+
+        connector = aiohttp.TCPConnector(limit=self.max_fetches, limit_per_host=self.per_host)
+        async with aiohttp.ClientSession(headers=self.scraper.headers, connector=connector) as http:
+
+            async def worker(article):
+                async with article_slots:
+                    if cancel_event is not None and cancel_event.is_set():
+                        return None
+                    try:
+                        success = await self._save_article(http, article, base_dir, formats, callback)
+                    except Exception as e:
+                        self.scraper.log(f"Error downloading {article['title']}: {e}", callback)
+                        self.scraper.metrics.count("articles_failed")
+                        # Same as the threaded path: the article must leave the in-flight progress state
+                        self.scraper.emit(events.ARTICLE_DONE, article, success=False, error=str(e))
+                        success = False
+                if on_result:
+                    on_result(article, success)
+                return success
+
+            return await asyncio.gather(*(worker(article) for article in articles))
+
+    async def _get(self, http, url, endpoint, deadline=None):
+        """
+        GET through the global scheduler, paced by the scraper's rate limiter, under the scraper's
+        RequestPolicy for endpoint (timeouts clipped to deadline, jittered retries). Returns (status, body).
+        """
+        policy = self.scraper.policies[endpoint]
+        attempt = 0
+        while True:
+            try:
+                status, body = await self._get_once(http, url, endpoint, policy, deadline)
+                # A throttled endpoint is left to the limiter's back-off instead of being retried right away
+                if (status not in policy.retry_statuses or attempt >= policy.retries
+                        or self.scraper.limiter.backing_off(endpoint)):
+                    return status, body
+            except DeadlineExceeded:
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt >= policy.retries:
+                    raise
+
+            pause = policy.backoff(attempt)
+            remaining = deadline.remaining() if deadline else None
+            if remaining is not None and remaining <= pause:
+                raise DeadlineExceeded(f"Deadline exceeded after {attempt + 1} attempts")
+            await asyncio.sleep(pause)
+            attempt += 1
+
+    async def _get_once(self, http, url, endpoint, policy, deadline):
+        limiter = self.scraper.limiter
+        metrics = self.scraper.metrics
+        # A rate-limit wait that would outlast the deadline fails now, without taking the slot
+        wait = limiter.reserve(endpoint, deadline.remaining() if deadline else None)
+        if wait is None:
+            raise DeadlineExceeded(f"Deadline exceeded waiting for a rate-limit slot ({endpoint})")
+        if wait > 0:
+            await asyncio.sleep(wait)
+        metrics.observe('throttle_wait', wait)
+
+        host = urlsplit(url).hostname or ""
+        host_slots = self._host_slots.get(host)
+        if host_slots is None:
+            host_slots = self._host_slots[host] = asyncio.Semaphore(self.per_host)
+
+        async with self._fetch_slots, host_slots:
+            remaining = deadline.check() if deadline else None
+            client_timeout = aiohttp.ClientTimeout(
+                total=remaining,
+                connect=policy.connect_timeout,
+                sock_read=policy.read_timeout
+            )
+            with metrics.timer(f'{endpoint}_fetch'):
+                async with http.get(url, timeout=client_timeout) as response:
+                    body = await response.read()
+        limiter.record(endpoint, response.status)
+        metrics.count(f"requests_{endpoint}")
+        metrics.count(f"bytes_{endpoint}", len(body))
+        return response.status, body
+
+    async def _fetch_image(self, http, img_url, deadline=None):
+        """Image bytes for img_url from the scraper's image store, downloading on a miss."""
+        store = self.scraper.image_store
+        if store is None:
+            # Offline runs make no requests: without a store every image is a miss
+            if self.scraper.offline:
+                return None
+            return await self._download_image(http, img_url, deadline)
+
+        data = await asyncio.to_thread(store.get, img_url)
+        if data is None and not self.scraper.offline:
+            data = await self._download_image(http, img_url, deadline)
+            if data:
+                await asyncio.to_thread(store.put, img_url, data)
+        return data
+
+    async def _download_image(self, http, img_url, deadline=None):
+        """
+        Download one image; concurrent requests for the same URL share a single download.
+        The shared download has its own per-article budget, and each caller waits for it only
+        as long as its own deadline allows, so one article's expired deadline never fails another's image.
+        """
+        task = self._in_flight.get(img_url)
+        if task is None:
+            task = self._in_flight[img_url] = asyncio.ensure_future(
+                self._get(http, img_url, 'image', Deadline(self.scraper.article_deadline))
+            )
+            # Only dedup while in flight, so memory does not grow with the whole job
+            task.add_done_callback(lambda _: self._in_flight.pop(img_url, None))
+            # Every caller may have given up already; mark a failure as seen so asyncio doesn't log it
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        remaining = deadline.remaining() if deadline else None
+        try:
+            status, body = await asyncio.wait_for(asyncio.shield(task), remaining)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"Deadline exceeded waiting for {img_url}") from None
+        return body if status == 200 else None
+
+    async def _fetch_page(self, http, article, deadline, callback):
+        """Article page text from the scraper's page cache, downloading on a miss. None on failure."""
+        scraper = self.scraper
+        cache = scraper.page_cache
+        page_html = await asyncio.to_thread(scraper._cached_page, article)
+        if page_html is not None:
+            return page_html
+        if scraper.offline:
+            scraper.log(f"Not cached: {article['title']}", callback)
+            return None
+
+        try:
+            status, body = await self._get(http, article['link'], 'article', deadline)
+        except (aiohttp.ClientError, asyncio.TimeoutError, DeadlineExceeded) as e:
+            scraper.log(f"Error downloading {article['title']}: {e}", callback)
+            return None
+        if status != 200:
+            scraper.log(f"Failed to download {article['title']}: Status {status}", callback)
+            return None
+        page_html = body.decode('utf-8', errors='replace')
+        if cache is not None:
+            await asyncio.to_thread(cache.put, article['link'], page_html)
+        return page_html
+
+    async def _save_article(self, http, article, base_dir, formats, callback):
+        scraper = self.scraper
+        # Manifest check first, so already written articles cost no request at all
+        formats = await asyncio.to_thread(scraper.pending_formats, article, base_dir, formats, callback)
+        if not formats:
+            scraper.emit(events.ARTICLE_SKIPPED, article)
+            return False
+
+        scraper.emit(events.ARTICLE_START, article, formats=list(formats))
+        deadline = Deadline(scraper.article_deadline)
+        page_html = await self._fetch_page(http, article, deadline, callback)
+        if page_html is None:
+            scraper.metrics.count("articles_failed")
+            scraper.emit(events.ARTICLE_DONE, article, success=False)
+            return False
+
+        def parse():
+            with scraper.metrics.timer('parse'):
+                return parse_page(page_html, scraper.parser, not needs_full_page(formats))
+
+        soup = await asyncio.to_thread(parse)
+        urls = list(dict.fromkeys(image_urls(soup)))
+        scraper.emit(events.ARTICLE_FETCHED, article, bytes=len(page_html), images=len(urls))
+        done = 0
+
+        async def fetch(url):
+            nonlocal done
+            data = None
+            try:
+                data = await self._fetch_image(http, url, deadline)
+            finally:
+                done += 1
+                scraper.emit(events.IMAGE, article, done=done, total=len(urls), ok=isinstance(data, bytes))
+            return data
+
+        results = await asyncio.gather(*(fetch(url) for url in urls), return_exceptions=True)
+        images = dict(zip(urls, results))
+
+        def finish():
+            with scraper.metrics.timer('parse'):
+                parsed = build_article(article, soup, images)
+            return scraper._write_outputs(article, base_dir, formats, parsed, callback)
+
+        # Block extraction and PDF/DOCX writing are blocking; keep them off the event loop
+        return await asyncio.to_thread(finish)
@@ -139,46 +139,85 @@ def check_login_status(driver):
         print(f"Error checking login status: {e}")
         return False, None, None
 
+CREDENTIAL_TTL = 86400  # Saved logins are treated as expired after 24 hours
+
+def _read_cache():
+    """Decode the cache file into a list of credential dicts (handles the old single-login format)."""
+    if not os.path.exists(AUTH_CACHE_FILE):
+        return []
+        
+    with open(AUTH_CACHE_FILE, "r") as f:
+        encoded_str = f.read()
+        
+    json_str = base64.b64decode(encoded_str).decode('utf-8')
+    data = json.loads(json_str)
+    if "credentials" in data:
+        return data["credentials"]
+    return [data]
+
+def _write_cache(entries):
+    # Simple obfuscation
+    json_str = json.dumps({"credentials": entries})
+    encoded_str = base64.b64encode(json_str.encode('utf-8')).decode('utf-8')
+    
+    with open(AUTH_CACHE_FILE, "w") as f:
+        f.write(encoded_str)
+
+def _is_fresh(entry):
+    return time.time() - entry.get("timestamp", 0) <= CREDENTIAL_TTL
+
 def save_credentials(cookie, token):
-    """Save credentials to a local file."""
+    """Add (or refresh) a login in the local credential pool file."""
     try:
-        data = {
+        try:
+            entries = [e for e in _read_cache() if _is_fresh(e) and e.get("token") != token]
+        except Exception as e:
+            print(f"Error reading existing credentials: {e}")
+            entries = []
+            
+        entries.insert(0, {
             "cookie": cookie,
             "token": token,
             "timestamp": time.time()
-        }
-        # Simple obfuscation
-        json_str = json.dumps(data)
-        encoded_str = base64.b64encode(json_str.encode('utf-8')).decode('utf-8')
-        
-        with open(AUTH_CACHE_FILE, "w") as f:
-            f.write(encoded_str)
+        })
+        _write_cache(entries)
         return True
     except Exception as e:
         print(f"Error saving credentials: {e}")
         return False
 
-def load_credentials():
-    """Load credentials from local file."""
-    if not os.path.exists(AUTH_CACHE_FILE):
-        return None, None
-        
+def load_credential_pool():
+    """Load all saved, unexpired logins. Returns a list of (cookie, token), newest first."""
     try:
-        with open(AUTH_CACHE_FILE, "r") as f:
-            encoded_str = f.read()
-            
-        json_str = base64.b64decode(encoded_str).decode('utf-8')
-        data = json.loads(json_str)
-        
-        # Optional: Check if expired (e.g., > 24 hours)
-        if time.time() - data.get("timestamp", 0) > 86400:
-            print("Credentials expired.")
-            return None, None
-            
-        return data.get("cookie"), data.get("token")
+        entries = _read_cache()
     except Exception as e:
         print(f"Error loading credentials: {e}")
+        return []
+        
+    pool = [(e.get("cookie"), e.get("token")) for e in entries if _is_fresh(e) and e.get("cookie") and e.get("token")]
+    if entries and not pool:
+        print("Credentials expired.")
+    return pool
+
+def load_credentials():
+    """Load the most recent credentials from local file."""
+    pool = load_credential_pool()
+    if not pool:
         return None, None
+    return pool[0]
+
+def remove_credentials(token):
+    """Drop one login from the pool (e.g. after its session became invalid)."""
+    try:
+        entries = [e for e in _read_cache() if e.get("token") != token]
+        if entries:
+            _write_cache(entries)
+        else:
+            clear_credentials()
+        return True
+    except Exception as e:
+        print(f"Error removing credentials: {e}")
+        return False
 
 def clear_credentials():
     """Clear saved credentials."""
@@ -0,0 +1,220 @@
+"""
+Local stand-in for the WeChat endpoints the scraper talks to, for offline benchmarking.
+
+    /cgi-bin/searchbiz    account search (always finds the queried name)
+    /cgi-bin/appmsg       list_ex pages of 5 articles; every Nth call answers ret=200013 (freq control)
+    /s?__biz=..&mid=N     article page: large inline script/style head, #js_content body, lazy data-src images
+    /mmbiz_jpg/...        image CDN with configurable latency; every Nth request can stall (slow tail)
+
+Run standalone with `python benchmarks/mock_wechat.py --port 8800`.
+"""
+import io
+import json
+import time
+import zlib
+import struct
+import random
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MOCK_FAKEID = "MzMOCKFAKEID=="
+PAGE_SIZE = 5
+DAY = 86400
+
+
+def _png(width, height, seed):
+    """Noisy RGB PNG built with zlib only, so the mock works without Pillow."""
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(height):
+        row = bytes(rng.getrandbits(8) if x % 7 == 0 else 128 for x in range(width * 3))
+        rows.append(b"\x00" + row)
+    raw = zlib.compress(b"".join(rows), 6)
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xffffffff)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", raw) + chunk(b"IEND", b"")
+
+
+def make_image(width, height, seed):
+    """JPEG like the real CDN when Pillow is installed, PNG otherwise."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return _png(width, height, seed)
+    img = Image.effect_noise((width, height), 30 + seed % 20).convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=90)
+    return buf.getvalue()
+
+
+class MockConfig:
+    def __init__(self, articles=60, images_per_article=8, image_width=1280, image_height=720,
+                 image_variants=12, image_latency=0.02, article_latency=0.05, list_latency=0.02,
+                 freq_control_every=4, paragraphs=40, image_stall_every=0, image_stall=5.0):
+        self.articles = articles
+        self.images_per_article = images_per_article
+        self.image_width = image_width
+        self.image_height = image_height
+        self.image_variants = image_variants            # Distinct image bodies served by the CDN
+        self.image_latency = image_latency
+        self.article_latency = article_latency
+        self.list_latency = list_latency
+        self.freq_control_every = freq_control_every    # 0 disables injected 200013 responses
+        self.paragraphs = paragraphs
+        self.image_stall_every = image_stall_every      # 0 disables stalled image responses
+        self.image_stall = image_stall                  # Extra seconds a stalled image response takes
+
+
+class MockWeChat:
+    """Threaded mock server. Counts requests per endpoint so throughput can be computed."""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or MockConfig()
+        self.host = host
+        self.port = port
+        self.counts = {"searchbiz": 0, "appmsg": 0, "freq_control": 0, "article": 0, "image": 0, "image_stalled": 0}
+        self._lock = threading.Lock()
+        self._server = None
+        self._images = [
+            make_image(self.config.image_width, self.config.image_height, seed)
+            for seed in range(self.config.image_variants)
+        ]
+        self._now = int(time.time())
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+            return self.counts[name]
+
+    def _list_page(self, begin):
+        items = []
+        for mid in range(begin, min(begin + PAGE_SIZE, self.config.articles)):
+            items.append({
+                "title": f"基准测试文章 {mid:04d}: 关于性能的一些思考",
+                "link": f"{self.base_url}/s?__biz={MOCK_FAKEID}&mid={mid}&idx=1&sn=mock{mid}",
+                "create_time": self._now - mid * DAY,
+                "digest": "本地基准测试用的模拟文章摘要"
+            })
+        return {"base_resp": {"ret": 0, "err_msg": "ok"}, "app_msg_list": items, "app_msg_cnt": self.config.articles}
+
+    def _article_page(self, mid):
+        cfg = self.config
+        # Real article pages carry ~100 KB of inline script and style before the content
+        script = "var __wx_config = {};\n" + "\n".join(f"function f{i}(a,b){{return a+b*{i};}}" for i in range(2500))
+        style = "\n".join(f".rich_media_c{i}{{margin:{i % 9}px;color:#333;}}" for i in range(1500))
+        body = []
+        for i in range(cfg.paragraphs):
+            if i % 10 == 0:
+                body.append(f"<h2>第 {i // 10 + 1} 节</h2>")
+            body.append(f"<p><span>这是第 {mid} 篇文章的第 {i} 段。" + "微信公众号文章正文内容，" * 12 + "</span></p>")
+            if cfg.paragraphs and i % max(1, cfg.paragraphs // max(1, cfg.images_per_article)) == 0:
+                n = (mid + i) % cfg.image_variants
+                body.append(
+                    f'<p><img class="rich_pages wxw-img" data-src="{self.base_url}/mmbiz_jpg/{n}/640?wx_fmt=jpeg&from=appmsg" '
+                    f'data-ratio="0.5625" data-w="{cfg.image_width}"></p>'
+                )
+        # Shared footer image, as most accounts end every article with the same QR code
+        body.append(f'<p><img data-src="{self.base_url}/mmbiz_jpg/0/640?wx_fmt=jpeg"></p>')
+        return (
+            "<!DOCTYPE html><html><head><meta charset=\"utf-8\">"
+            f"<title>Article {mid}</title><style>{style}</style><script>{script}</script></head>"
+            f"<body><div id=\"img-content\"><h1 class=\"rich_media_title\">Article {mid}</h1>"
+            f"<div class=\"rich_media_content\" id=\"js_content\" style=\"visibility: hidden;\">{''.join(body)}</div>"
+            "</div></body></html>"
+        )
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, body, content_type):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _json(self, data):
+                self._send(json.dumps(data, ensure_ascii=False).encode("utf-8"), "application/json")
+
+            def do_GET(self):
+                cfg = mock.config
+                parts = urlsplit(self.path)
+                query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+
+                if parts.path == "/cgi-bin/searchbiz":
+                    mock._count("searchbiz")
+                    time.sleep(cfg.list_latency)
+                    self._json({"base_resp": {"ret": 0}, "list": [
+                        {"nickname": query.get("query", ""), "fakeid": MOCK_FAKEID}
+                    ]})
+                elif parts.path == "/cgi-bin/appmsg":
+                    n = mock._count("appmsg")
+                    time.sleep(cfg.list_latency)
+                    if cfg.freq_control_every and n % cfg.freq_control_every == 0:
+                        mock._count("freq_control")
+                        self._json({"base_resp": {"ret": 200013, "err_msg": "freq control"}})
+                    else:
+                        self._json(mock._list_page(int(query.get("begin", 0))))
+                elif parts.path == "/s":
+                    mock._count("article")
+                    time.sleep(cfg.article_latency)
+                    self._send(mock._article_page(int(query.get("mid", 0))).encode("utf-8"), "text/html; charset=utf-8")
+                elif parts.path.startswith("/mmbiz_jpg/"):
+                    n = mock._count("image")
+                    delay = cfg.image_latency
+                    if cfg.image_stall_every and n % cfg.image_stall_every == 0:
+                        mock._count("image_stalled")
+                        delay += cfg.image_stall
+                    time.sleep(delay)
+                    n = int(parts.path.split("/")[2]) % len(mock._images)
+                    self._send(mock._images[n], "image/jpeg")
+                else:
+                    self.send_error(404)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve mock WeChat endpoints.")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--articles", type=int, default=60)
+    args = parser.parse_args()
+    mock = MockWeChat(MockConfig(articles=args.articles), port=args.port).start()
+    print(f"Mock WeChat on {mock.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        mock.stop()
+
+
+if __name__ == "__main__":
+    main()
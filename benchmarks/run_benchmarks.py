@@ -0,0 +1,267 @@
+"""
+Offline throughput benchmark against the local mock WeChat server.
+
+    python benchmarks/run_benchmarks.py                     # run and compare with baseline.json
+    python benchmarks/run_benchmarks.py --save-baseline     # run and store the results as the new baseline
+    python benchmarks/run_benchmarks.py --formats docx --articles 30
+
+Each output format runs in its own subprocess (fresh caches, separate peak RSS) through the same
+path as the app: get_fakeid -> iter_articles -> DownloadPipeline -> save_article_content.
+Exits with status 1 when a metric regresses by more than --tolerance against the baseline.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from mock_wechat import MockWeChat, MockConfig
+
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_FORMATS = ("docx", "html", "pdf")
+DEFAULT_TOLERANCE = 0.25
+
+# Generous limits so the benchmark measures the scraper, not the pacing; the injected
+# freq-control responses still exercise the back-off path with a short penalty
+BENCH_LIMITS = {
+    "searchbiz": (50.0, 1.0, 100.0, 4),
+    "appmsg": (50.0, 1.0, 100.0, 4),
+    "article": (200.0, 10.0, 1000.0, 16),
+    "image": (2000.0, 50.0, 5000.0, 64),
+}
+BENCH_BACKOFF_BASE = 0.05
+
+# metric -> True if higher is better
+METRICS = {
+    "articles_per_s": True,
+    "images_per_s": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "peak_rss_mb": False,
+}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = (len(values) - 1) * pct / 100.0
+    low = int(k)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (k - low)
+
+
+def peak_rss_mb():
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def run_scenario(fmt, base_url, workers):
+    """Runs inside the worker subprocess. Returns the raw measurements for one format."""
+    import rate_limiter
+    rate_limiter.BACKOFF_BASE = BENCH_BACKOFF_BASE
+    from rate_limiter import RateLimiter
+    from image_store import ImageStore
+    from article_index import ArticleIndex
+    from wechat_scraper import WeChatScraper
+    from download_pipeline import DownloadPipeline
+
+    tmp = tempfile.mkdtemp(prefix="wechat_bench_")
+    scraper = WeChatScraper(
+        "bench_cookie", "bench_token", pool_maxsize=workers * 2, pdf_workers=workers,
+        image_store=ImageStore(os.path.join(tmp, ".image_cache")),
+        article_index=ArticleIndex(os.path.join(tmp, "index.sqlite")),
+        rate_limiter=RateLimiter(BENCH_LIMITS), base_url=base_url,
+        page_cache=False  # Every run must fetch its pages
+    )
+
+    latencies = []
+    results = []
+    save = scraper.save_article_content
+
+    def timed_save(article, base_dir, formats, callback=None):
+        started = time.perf_counter()
+        ok = save(article, base_dir, formats, callback)
+        latencies.append(time.perf_counter() - started)
+        return ok
+
+    scraper.save_article_content = timed_save
+    logs = []
+
+    started = time.perf_counter()
+    try:
+        fakeid = scraper.get_fakeid("基准测试公众号", logs.append, use_cache=False)
+        pipeline = DownloadPipeline(scraper, max_workers=workers)
+        for event in pipeline.run(fakeid, os.path.join(tmp, "out"), [fmt]):
+            if event[0] == 'done':
+                results.append(event[2] and event[3] is None)
+            elif event[0] == 'log':
+                logs.append(event[1])
+        elapsed = time.perf_counter() - started
+        throttle_events = sum(login['appmsg']['throttle_events'] for login in scraper.rate_limit_stats()['logins'])
+        images = scraper.image_normalizer_stats()
+    finally:
+        scraper.close()
+
+    return {
+        "format": fmt,
+        "articles": len(results),
+        "succeeded": sum(1 for ok in results if ok),
+        "elapsed_s": elapsed,
+        "latencies": latencies,
+        "images_embedded": images["images"] if images else None,
+        "freq_control_retries": throttle_events,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def chrome_available():
+    from shutil import which
+    return any(which(name) for name in ("chromium", "chromium-browser", "google-chrome", "google-chrome-stable")) \
+        or os.path.exists("/Applications/Google Chrome.app/Contents/MacOS/Google Chrome")
+
+
+def run_format(fmt, mock, workers):
+    """Run one format in a fresh subprocess and turn its measurements into metrics."""
+    before = dict(mock.counts)
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--scenario", fmt, "--base-url", mock.base_url,
+         "--workers", str(workers)],
+        capture_output=True, text=True, cwd=REPO_DIR
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{fmt} benchmark failed:\n{proc.stderr[-2000:]}")
+    raw = json.loads(proc.stdout.strip().splitlines()[-1])
+    image_requests = mock.counts["image"] - before["image"]
+    elapsed = raw["elapsed_s"]
+    latencies_ms = [t * 1000 for t in raw["latencies"]]
+    return {
+        "articles": raw["articles"],
+        "succeeded": raw["succeeded"],
+        "elapsed_s": round(elapsed, 2),
+        "articles_per_s": round(raw["articles"] / elapsed, 2),
+        "images_per_s": round((raw["images_embedded"] or image_requests) / elapsed, 1),
+        "image_requests": image_requests,
+        "freq_control_responses": mock.counts["freq_control"] - before["freq_control"],
+        "p50_ms": round(percentile(latencies_ms, 50), 1),
+        "p95_ms": round(percentile(latencies_ms, 95), 1),
+        "peak_rss_mb": round(raw["peak_rss_mb"], 1),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """List of regression messages (empty if none)."""
+    regressions = []
+    for fmt, metrics in results.items():
+        base = baseline.get("results", {}).get(fmt)
+        if not base:
+            continue
+        for name, higher_is_better in METRICS.items():
+            if name not in base or not base[name]:
+                continue
+            change = (metrics[name] - base[name]) / base[name]
+            if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+                regressions.append(f"{fmt}.{name}: {base[name]} -> {metrics[name]} ({change:+.0%})")
+    return regressions
+
+
+def print_table(results, baseline):
+    header = f"{'format':<8}{'art/s':>9}{'img/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'RSS MB':>9}{'ok':>8}"
+    print(header)
+    print("-" * len(header))
+    for fmt, m in results.items():
+        print(f"{fmt:<8}{m['articles_per_s']:>9}{m['images_per_s']:>9}{m['p50_ms']:>10}{m['p95_ms']:>10}"
+              f"{m['peak_rss_mb']:>9}{m['succeeded']:>5}/{m['articles']}")
+        base = baseline.get("results", {}).get(fmt)
+        if base:
+            print(f"{'  base':<8}{base['articles_per_s']:>9}{base['images_per_s']:>9}{base['p50_ms']:>10}"
+                  f"{base['p95_ms']:>10}{base['peak_rss_mb']:>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline WeChat scraper benchmark.")
+    parser.add_argument("--formats", nargs="+", default=list(DEFAULT_FORMATS), choices=DEFAULT_FORMATS)
+    parser.add_argument("--articles", type=int, default=40)
+    parser.add_argument("--images", type=int, default=8, help="Images per article")
+    parser.add_argument("--image-latency", type=float, default=0.02, help="CDN latency in seconds")
+    parser.add_argument("--article-latency", type=float, default=0.05)
+    parser.add_argument("--freq-control-every", type=int, default=4, help="Answer every Nth appmsg call with 200013 (0: never)")
+    parser.add_argument("--image-stall-every", type=int, default=0, help="Stall every Nth image response (0: never)")
+    parser.add_argument("--image-stall", type=float, default=5.0, help="Seconds a stalled image response takes")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    # Internal: run one scenario in this process
+    parser.add_argument("--scenario", help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.scenario:
+        result = run_scenario(args.scenario, args.base_url, args.workers)
+        sys.stdout.write(json.dumps(result) + "\n")
+        return 0
+
+    formats = list(args.formats)
+    if "pdf" in formats and not chrome_available():
+        print("Chrome not found, skipping pdf", file=sys.stderr)
+        formats.remove("pdf")
+
+    config = MockConfig(articles=args.articles, images_per_article=args.images, image_latency=args.image_latency,
+                        article_latency=args.article_latency, freq_control_every=args.freq_control_every,
+                        image_stall_every=args.image_stall_every, image_stall=args.image_stall)
+    mock = MockWeChat(config).start()
+    try:
+        results = {fmt: run_format(fmt, mock, args.workers) for fmt in formats}
+    finally:
+        mock.stop()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    config_used = {"articles": args.articles, "images": args.images, "image_latency": args.image_latency,
+                   "article_latency": args.article_latency, "freq_control_every": args.freq_control_every,
+                   "workers": args.workers}
+    if args.image_stall_every:
+        config_used.update(image_stall_every=args.image_stall_every, image_stall=args.image_stall)
+    if baseline and baseline.get("config") != config_used:
+        print("Note: baseline was recorded with a different configuration", file=sys.stderr)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results, baseline)
+
+    if args.save_baseline:
+        data = {
+            "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+            "config": config_used,
+            "results": dict(baseline.get("results", {}), **results)
+        }
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+            f.write("\n")
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""
+Headless batch downloader: runs the same jobs as the Streamlit app without a browser session.
+
+    python cli.py 薪火传 另一个公众号 --days 30 --formats docx pdf --jobs 2
+    python cli.py --file accounts.txt --since 2024-01-01 --zip
+    python cli.py 薪火传 --report report.json --metrics-port 9108
+    python cli.py 薪火传 --formats pdf --from-cache        # re-export cached articles, no network
+
+Uses the login saved by the app (scan the QR code there once). Progress is printed to stdout
+as one JSON object per line; plain log output from the scraper goes to stderr.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import threading
+from contextlib import redirect_stdout
+from concurrent.futures import ThreadPoolExecutor
+
+from wechat_scraper import WeChatScraper
+from auth_helper import load_credentials, load_credential_pool
+from download_pipeline import DownloadPipeline
+from archive_writer import IncrementalZip
+from docx_pool import DocxProcessPool, DEFAULT_DOCX_PROCESSES
+from metrics import start_metrics_server
+
+# Defaults match the app
+DEFAULT_WORKERS = 4
+DEFAULT_JOBS = 1
+DEFAULT_OUTPUT_DIR = "downloads"
+FORMATS = ("html", "pdf", "docx")
+
+
+class EventWriter:
+    """Thread-safe JSON-lines writer for progress events."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def emit(self, event, **fields):
+        record = {"event": event, "time": round(time.time(), 3)}
+        record.update(fields)
+        with self._lock:
+            self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.stream.flush()
+
+
+def read_account_names(names, path=None):
+    """Account names from the command line plus an optional file (one per line, # starts a comment)."""
+    result = list(names)
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    result.append(line)
+    # Keep order, drop duplicates
+    return list(dict.fromkeys(result))
+
+
+def parse_date_range(args):
+    """(start_date, end_date) from --days or --since/--until, or None for the whole history."""
+    today = datetime.date.today()
+    if args.days:
+        return (today - datetime.timedelta(days=args.days), today)
+    if args.since or args.until:
+        start = datetime.date.fromisoformat(args.since) if args.since else datetime.date.min
+        end = datetime.date.fromisoformat(args.until) if args.until else today
+        return (start, end)
+    return None
+
+
+def run_account(scraper, name, fakeid, args, date_range, writer):
+    """List and download one account (fakeid from resolve_fakeids). Returns its per-account summary."""
+    summary = {"account": name, "found": False, "listed": 0, "downloaded": 0, "skipped": 0, "failed": 0}
+    started = time.time()
+
+    def log(msg):
+        writer.emit("log", account=name, message=msg)
+
+    # 1. FakeID resolved up front for all accounts
+    if not fakeid:
+        writer.emit("account_not_found", account=name)
+        return summary
+    summary["found"] = True
+
+    # 2. List and download concurrently
+    target_dir = os.path.join(args.output, name)
+    os.makedirs(target_dir, exist_ok=True)
+    pipeline = DownloadPipeline(scraper, max_workers=args.workers, worker_logs=True)
+    archive = None
+    if args.zip:
+        # Filled as articles finish; --zip-deflate-all also deflates DOCX/PDF
+        archive = IncrementalZip(os.path.join(args.output, f"{name}_articles.zip"), target_dir,
+                                 store_compressed=not args.zip_deflate_all)
+    for event in pipeline.run(fakeid, target_dir, args.formats, date_range=date_range):
+        if event[0] == 'log':
+            log(event[1])
+        elif event[0] == 'listing_done':
+            writer.emit("listing_done", account=name, listed=event[1])
+        elif event[0] == 'done':
+            _, article, success, exc = event
+            if archive is not None:
+                for path in scraper.output_files(article, target_dir, args.formats):
+                    archive.add(path)
+            if exc is not None:
+                summary["failed"] += 1
+                status = "failed"
+            elif success:
+                summary["downloaded"] += 1
+                status = "downloaded"
+            else:
+                summary["skipped"] += 1
+                status = "skipped"
+            writer.emit("article", account=name, status=status, title=article['title'], link=article['link'],
+                        date=article['date_str'], error=str(exc) if exc else None,
+                        processed=pipeline.finished, listed=pipeline.listed)
+    summary["listed"] = pipeline.listed
+
+    # 3. Optional ZIP next to the account folder
+    if archive is not None:
+        if pipeline.listed:
+            zip_path = archive.close()
+            writer.emit("zip", account=name, path=zip_path, **archive.stats())
+        else:
+            archive.abort()
+
+    summary["elapsed_s"] = round(time.time() - started, 1)
+    writer.emit("account_done", **summary)
+    return summary
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Batch download WeChat official account articles.")
+    parser.add_argument("accounts", nargs="*", help="Official account names")
+    parser.add_argument("--file", help="File with one account name per line")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=["docx"], help="Export formats (default: docx)")
+    parser.add_argument("--days", type=int, help="Only articles from the last N days")
+    parser.add_argument("--since", help="Only articles published on or after YYYY-MM-DD")
+    parser.add_argument("--until", help="Only articles published on or before YYYY-MM-DD")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_DIR, help="Output directory (one sub-folder per account)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Download threads per account")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS, help="Accounts processed in parallel")
+    parser.add_argument("--docx-processes", type=int, default=DEFAULT_DOCX_PROCESSES,
+                        help="Processes building Word documents (default: one per core, 0 builds them in the download threads)")
+    parser.add_argument("--html-assets", action="store_true",
+                        help="Write images once into HTML/assets/ and link them instead of inlining Base64 (PDF renders from it too when HTML is also written)")
+    parser.add_argument("--zip", action="store_true", help="Also pack each account folder into a ZIP")
+    parser.add_argument("--zip-deflate-all", action="store_true",
+                        help="Deflate DOCX/PDF too (by default they are stored, being compressed already)")
+    parser.add_argument("--report", help="Write a JSON report (per-stage timings, counters, pool stats) to this file")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this port while running")
+    parser.add_argument("--from-cache", action="store_true",
+                        help="Re-export from the local page/image caches only, without any request to WeChat")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="Write outputs again even if they exist (e.g. after a converter change)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    writer = EventWriter(sys.stdout)
+
+    names = read_account_names(args.accounts, args.file)
+    if not names:
+        writer.emit("error", message="No account names given")
+        return 2
+
+    # auth_helper reports expired or unreadable credentials with plain prints; keep them off the JSON stream
+    with redirect_stdout(sys.stderr):
+        cookie, token = load_credentials()
+    if (not cookie or not token) and not args.from_cache:
+        writer.emit("error", message="No saved login. Run `streamlit run app.py` and scan the QR code first.")
+        return 2
+
+    date_range = parse_date_range(args)
+    jobs = max(1, args.jobs)
+    workers = max(1, args.workers)
+    docx_pool = None
+    if 'docx' in args.formats and args.docx_processes > 0:
+        docx_pool = DocxProcessPool(args.docx_processes)
+        # Enough download threads to keep every Word-building process fed
+        workers = max(workers, -(-docx_pool.processes // jobs))
+    args.workers = workers
+
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
+
+    # Keep stdout clean for JSON lines; plain prints from the scraper go to stderr
+    with redirect_stdout(sys.stderr):
+        scraper = WeChatScraper(cookie, token, pool_maxsize=workers * jobs * 2, pdf_workers=min(workers, DEFAULT_WORKERS),
+                                credentials=[(cookie, token)] + load_credential_pool(), docx_pool=docx_pool,
+                                html_assets=args.html_assets, offline=args.from_cache, overwrite=args.overwrite)
+        writer.emit("start", accounts=names, formats=args.formats, jobs=jobs, workers=workers,
+                    date_range=[str(d) for d in date_range] if date_range else None)
+        started = time.time()
+        try:
+            # All names first: cached ones cost no request, the rest share the searchbiz pacing
+            fakeids = scraper.resolve_fakeids(names, lambda msg: writer.emit("log", message=msg))
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                summaries = list(executor.map(
+                    lambda name: run_account(scraper, name, fakeids.get(name), args, date_range, writer), names
+                ))
+
+            elapsed = time.time() - started
+            processed = sum(s["downloaded"] + s["skipped"] + s["failed"] for s in summaries)
+            conn_stats = scraper.connection_stats()
+            rl_stats = scraper.rate_limit_stats()
+            throttled = sum(rl_stats[k]['throttled_seconds'] for k in ('article', 'image'))
+            throttled += sum(login[k]['throttled_seconds'] for login in rl_stats['logins'] for k in ('searchbiz', 'appmsg'))
+            report = scraper.metrics_report()
+            writer.emit(
+                "summary",
+                accounts=len(names),
+                accounts_found=sum(1 for s in summaries if s["found"]),
+                listed=sum(s["listed"] for s in summaries),
+                downloaded=sum(s["downloaded"] for s in summaries),
+                skipped=sum(s["skipped"] for s in summaries),
+                failed=sum(s["failed"] for s in summaries),
+                elapsed_s=round(elapsed, 1),
+                articles_per_s=round(processed / elapsed, 2) if elapsed else None,
+                http_requests=conn_stats['requests'],
+                connections_reused=conn_stats['connections_reused'],
+                throttled_s=round(throttled, 1),
+                image_cache=scraper.image_store_stats(),
+                image_normalization=scraper.image_normalizer_stats(),
+                stages_s={stage: data["total_s"] for stage, data in report["stages"].items()}
+            )
+            if args.report:
+                report["accounts"] = summaries
+                with open(args.report, "w", encoding="utf-8") as f:
+                    json.dump(report, f, ensure_ascii=False, indent=2)
+                writer.emit("report", path=os.path.abspath(args.report))
+        finally:
+            scraper.close()
+            if docx_pool is not None:
+                docx_pool.close()
+
+    return 0 if all(s["found"] for s in summaries) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+import time
+import threading
+from rate_limiter import shared_limiter, ACCOUNT_ENDPOINTS
+
+
+class Credential:
+    """One logged-in session with its per-endpoint rate buckets (shared per token across the process) and health state."""
+
+    def __init__(self, cookie, token, buckets):
+        self.cookie = cookie
+        self.token = token
+        self.buckets = buckets
+        self.healthy = True
+
+    @property
+    def label(self):
+        return f"...{self.token[-4:]}" if self.token else "?"
+
+
+class CredentialPool:
+    """
+    Spreads searchbiz/appmsg requests over several logged-in sessions.
+    Each request goes to the healthy credential that can send soonest; a credential that hits
+    freq control is parked by its own bucket's back-off while the others keep the job going.
+    The buckets come from the rate limiter's per-login registry, so concurrent jobs on the
+    same login together stay within that login's rate.
+    """
+
+    def __init__(self, credentials, limiter=None):
+        limiter = limiter or shared_limiter()
+        self.members = []
+        seen = set()
+        for cookie, token in credentials:
+            if cookie and token and token not in seen:
+                seen.add(token)
+                self.members.append(Credential(cookie, token, limiter.login_buckets(token)))
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.members)
+
+    def acquire(self, endpoint, stop=None):
+        """
+        Reserve a request slot on the best credential and wait for it (back-off included).
+        Returns None if none is usable, or as soon as stop (threading.Event) is set during the wait.
+        """
+        with self._lock:
+            healthy = [c for c in self.members if c.healthy]
+            if not healthy:
+                return None
+            credential = min(healthy, key=lambda c: c.buckets[endpoint].available_in())
+            wait = credential.buckets[endpoint].reserve()
+        if wait > 0:
+            if stop is None:
+                time.sleep(wait)
+            elif stop.wait(wait):
+                return None
+        return credential
+
+    def succeeded(self, credential, endpoint):
+        credential.buckets[endpoint].succeeded()
+
+    def throttled(self, credential, endpoint):
+        """Park the credential after a freq-control response. Returns its penalty in seconds."""
+        return credential.buckets[endpoint].throttled()
+
+    def invalidate(self, credential):
+        """Stop using a credential whose session is no longer valid."""
+        with self._lock:
+            credential.healthy = False
+
+    def stats(self):
+        return [
+            {
+                "credential": c.label,
+                "healthy": c.healthy,
+                **{name: c.buckets[name].stats() for name in ACCOUNT_ENDPOINTS}
+            }
+            for c in self.members
+        ]
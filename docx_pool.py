@@ -0,0 +1,125 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from article_model import Block, ParsedArticle
+from image_normalizer import ImageNormalizer
+from exporters import write_docx
+
+# One process per core; Word building is pure-Python CPU work that threads can't parallelize
+DEFAULT_DOCX_PROCESSES = os.cpu_count() or 1
+
+
+def docx_payload(parsed):
+    """
+    Picklable, minimal copy of what write_docx needs: blocks as tuples and the bytes of the
+    images they reference. The soup (large and slow to pickle) stays in the parent.
+    """
+    blocks = [(block.kind, block.text, block.level, block.url) for block in parsed.blocks]
+    images = {}
+    for block in parsed.blocks:
+        if block.kind == 'image' and block.url not in images:
+            images[block.url] = parsed.image_data(block.url)
+    return {
+        "title": parsed.title,
+        "date_str": parsed.date_str,
+        "has_content": parsed.has_content,
+        "blocks": blocks,
+        "images": images,
+        "text": None if parsed.has_content else parsed.plain_text()
+    }
+
+
+def _build_docx(payload, filepath, max_widths):
+    """Runs in a worker process. Writes the document to filepath (via a temp file, like the in-thread path); returns (images not added, image counters)."""
+    parsed = ParsedArticle(
+        payload["title"],
+        payload["date_str"],
+        None,
+        [Block(kind, text=text, level=level, url=url) for kind, text, level, url in payload["blocks"]],
+        payload["images"],
+        has_content=payload["has_content"],
+        text=payload["text"]
+    )
+    normalizer = ImageNormalizer(max_widths) if max_widths is not None else None
+    failed = write_docx(parsed, filepath, normalizer)
+    return failed, normalizer.stats() if normalizer is not None else None
+
+
+class DocxProcessPool:
+    """
+    Builds Word documents in a pool of worker processes while fetching stays on threads.
+    The calling thread blocks until its document is written (without holding the GIL),
+    so each download worker simply hands its article off and waits.
+    A worker process that dies (crash, OOM kill) breaks the executor; it is then replaced
+    and the document retried once on the fresh one.
+    """
+
+    def __init__(self, processes=DEFAULT_DOCX_PROCESSES):
+        self.processes = max(1, processes)
+        self._lock = threading.Lock()
+        self._executor = None
+        self.documents = 0
+        self.restarts = 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process that runs Chrome drivers and lock-holding threads is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _discard(self, executor):
+        """Drop a broken executor so the next call starts a fresh one (once, however many callers saw it break)."""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            self.restarts += 1
+        executor.shutdown(wait=False)
+
+    def write_docx(self, parsed, filepath, normalizer=None):
+        """Same contract as exporters.write_docx, executed in a worker process."""
+        max_widths = normalizer.max_widths if normalizer is not None else None
+        payload = docx_payload(parsed)
+        for attempt in range(2):
+            executor = self._get_executor()
+            try:
+                failed, stats = executor.submit(_build_docx, payload, filepath, max_widths).result()
+                break
+            except BrokenProcessPool:
+                self._discard(executor)
+                if attempt:
+                    raise
+        if normalizer is not None and stats:
+            normalizer.add_stats(stats)
+        with self._lock:
+            self.documents += 1
+        return failed
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def stats(self):
+        with self._lock:
+            return {"processes": self.processes, "documents": self.documents, "restarts": self.restarts}
+
+
+_shared_pool = None
+_shared_lock = threading.Lock()
+
+
+def shared_docx_pool():
+    """The Word-building process pool shared by every scraper in this process."""
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = DocxProcessPool()
+        return _shared_pool
@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from urllib.parse import urlsplit, parse_qs
+
+# Constants
+MANIFEST_FILE = ".manifest.json"
+JOURNAL_SUFFIX = ".journal"  # JSON lines of records made since the manifest was last compacted
+HASH_CHUNK = 1024 * 1024
+
+# Output sub-directory and extension per format
+OUTPUT_LAYOUT = {
+    "html": ("HTML", ".html"),
+    "pdf": ("PDF", ".pdf"),
+    "docx": ("Word", ".docx"),
+}
+
+
+def output_path(base_dir, fmt, filename_base):
+    sub_dir, ext = OUTPUT_LAYOUT[fmt]
+    return os.path.join(base_dir, sub_dir, f"{filename_base}{ext}")
+
+
+def article_key(link):
+    """
+    Stable id for an article link. WeChat links carry varying tracking parameters,
+    so __biz/mid/idx identify the article when present; otherwise the link itself is used.
+    """
+    query = parse_qs(urlsplit(link).query)
+    parts = [query.get(name, [""])[0] for name in ("__biz", "mid", "idx")]
+    if all(parts):
+        return "_".join(parts)
+    return link
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DownloadManifest:
+    """
+    Record of what has been written into one target directory:
+    article id -> {format: {path, sha256, size}}, with paths relative to the directory.
+    Lets a re-run decide which outputs already exist before any network request,
+    and find them again when the cleaned filename of a title has changed.
+
+    Each record is appended as one line to a journal next to the manifest, so recording
+    costs the same no matter how large the manifest is; close() folds the journal back
+    into the manifest. A journal left behind by an interrupted run is replayed on load.
+    """
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self.path = os.path.join(base_dir, MANIFEST_FILE)
+        self.journal_path = self.path + JOURNAL_SUFFIX
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._journal = None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f).get("articles", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Error reading manifest {self.path}: {e}")
+        self._replay_journal()
+
+    def _replay_journal(self):
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn last line of an interrupted write
+                        continue
+                    self._apply(record["key"], record["title"], record["format"], record["entry"])
+        except FileNotFoundError:
+            pass
+        except (OSError, KeyError) as e:
+            print(f"Error reading manifest journal {self.journal_path}: {e}")
+
+    def _apply(self, key, title, fmt, entry):
+        article_entry = self._entries.setdefault(key, {"title": title, "formats": {}})
+        article_entry["title"] = title
+        article_entry["formats"][fmt] = entry
+
+    def _save(self):
+        tmp_path = f"{self.path}.part"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"articles": self._entries}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def record(self, article, fmt, filepath):
+        """Remember a freshly written output file (hashes it once)."""
+        entry = {
+            "path": os.path.relpath(filepath, self.base_dir),
+            "sha256": file_sha256(filepath),
+            "size": os.path.getsize(filepath),
+            "recorded_at": time.time()
+        }
+        key = article_key(article['link'])
+        line = json.dumps({"key": key, "title": article['title'], "format": fmt, "entry": entry}, ensure_ascii=False)
+        with self._lock:
+            self._apply(key, article['title'], fmt, entry)
+            if self._journal is None:
+                self._journal = open(self.journal_path, "a", encoding="utf-8")
+            self._journal.write(line + "\n")
+            self._journal.flush()
+
+    def close(self):
+        """Compact: write the full manifest once and drop the journal."""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if not os.path.exists(self.journal_path):
+                return
+            try:
+                self._save()
+                os.remove(self.journal_path)
+            except OSError as e:
+                print(f"Error compacting manifest {self.path}: {e}")
+
+    def lookup(self, article, fmt, verify=False):
+        """
+        Absolute path of a previously written output that is still intact, or None.
+        Intact means present with the recorded size; verify=True also re-hashes the file.
+        """
+        with self._lock:
+            article_entry = self._entries.get(article_key(article['link']))
+            entry = article_entry and article_entry["formats"].get(fmt)
+            if not entry:
+                return None
+            entry = dict(entry)
+
+        filepath = os.path.join(self.base_dir, entry["path"])
+        try:
+            if os.path.getsize(filepath) != entry["size"]:
+                return None
+        except OSError:
+            return None
+        if verify and file_sha256(filepath) != entry["sha256"]:
+            return None
+        return filepath
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
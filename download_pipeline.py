@@ -0,0 +1,116 @@
+import queue
+import threading
+
+_DONE = object()
+JOIN_POLL = 0.1  # Seconds between queue drains while waiting for the threads to exit
+CANCEL_POLL = 0.5  # Seconds between cancel checks while no event arrives
+
+
+class DownloadPipeline:
+    """
+    Overlaps listing and downloading: one producer thread pages through iter_articles and feeds
+    a bounded queue that MAX_WORKERS download threads drain. When the workers fall behind, the
+    queue fills up and listing pauses (backpressure).
+
+    run() yields progress events on the caller's thread, so a UI can update safely:
+        ('log', message)              listing log line
+        ('listed', article, count)    article queued for download; count listed so far
+        ('listing_done', count)       listing finished
+        ('done', article, success, error)
+    worker_logs=True also forwards the download threads' own log lines as ('log', message) events.
+    Setting cancel_event (threading.Event) ends run() within CANCEL_POLL seconds, even while
+    listing waits out a rate-limit back-off.
+    """
+
+    def __init__(self, scraper, max_workers=4, queue_size=None, worker_logs=False):
+        self.scraper = scraper
+        self.max_workers = max_workers
+        self.queue_size = queue_size or max_workers * 2
+        self.worker_logs = worker_logs
+        self.listed = 0
+        self.finished = 0
+
+    def run(self, fakeid, base_dir, formats, date_range=None, cancel_event=None):
+        work = queue.Queue(maxsize=self.queue_size)
+        events = queue.Queue()
+        stop = threading.Event()
+
+        def produce():
+            try:
+                articles = self.scraper.iter_articles(fakeid, lambda msg: events.put(('log', msg)), date_range, stop)
+                for count, article in enumerate(articles, 1):
+                    if stop.is_set():
+                        break
+                    events.put(('listed', article, count))
+                    work.put(article)
+                    if stop.is_set():
+                        break
+                articles.close()
+            except Exception as e:
+                events.put(('log', f"Exception in get_articles: {e}"))
+            finally:
+                events.put(('listing_done', None))
+                for _ in range(self.max_workers):
+                    work.put(_DONE)
+
+        def consume():
+            callback = (lambda msg: events.put(('log', msg))) if self.worker_logs else None
+            while True:
+                article = work.get()
+                if article is _DONE or stop.is_set():
+                    break
+                try:
+                    # The UI only sees events on its own thread, never a direct callback
+                    success = self.scraper.save_article_content(article, base_dir, formats, callback=callback)
+                    events.put(('done', article, success, None))
+                except Exception as e:
+                    events.put(('done', article, False, e))
+            events.put(('worker_exit',))
+
+        threads = [threading.Thread(target=produce, daemon=True)]
+        threads += [threading.Thread(target=consume, daemon=True) for _ in range(self.max_workers)]
+        for thread in threads:
+            thread.start()
+
+        running = self.max_workers
+        try:
+            while running:
+                try:
+                    event = events.get(timeout=CANCEL_POLL)
+                except queue.Empty:
+                    event = None
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                if event is None:
+                    continue
+                if event[0] == 'worker_exit':
+                    running -= 1
+                    continue
+                if event[0] == 'listed':
+                    self.listed = event[2]
+                elif event[0] == 'listing_done':
+                    event = ('listing_done', self.listed)
+                elif event[0] == 'done':
+                    self.finished += 1
+                yield event
+        finally:
+            # Consumer stopped early: let the threads wind down after their current item, and wait
+            # for them, so nothing is still using the scraper once run() is closed
+            stop.set()
+            producer, consumers = threads[0], threads[1:]
+            while producer.is_alive():
+                # Keep the queue empty so the producer cannot block on a put
+                while True:
+                    try:
+                        work.get_nowait()
+                    except queue.Empty:
+                        break
+                producer.join(JOIN_POLL)
+            for thread in consumers:
+                while thread.is_alive():
+                    # Its _DONE marker may have been drained above; idle workers need one to wake up
+                    try:
+                        work.put_nowait(_DONE)
+                    except queue.Full:
+                        pass
+                    thread.join(JOIN_POLL)
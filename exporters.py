@@ -0,0 +1,183 @@
+import os
+import base64
+import hashlib
+import threading
+from io import BytesIO
+from docx import Document
+from docx.shared import Inches
+from image_normalizer import sniff_mime_type
+
+DOCX_IMAGE_WIDTH = Inches(5.5)
+ASSETS_DIR_NAME = "assets"
+
+MIME_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+    "image/svg+xml": ".svg",
+    "image/bmp": ".bmp",
+}
+
+
+def _guess_mime_type(img_url):
+    mime_type = "image/jpeg"
+    if "png" in img_url: mime_type = "image/png"
+    elif "gif" in img_url: mime_type = "image/gif"
+    elif "svg" in img_url: mime_type = "image/svg+xml"
+    return mime_type
+
+
+class AssetStore:
+    """
+    Shared, hash-named image directory next to the HTML files of one account.
+    Each distinct image is written once and referenced by every article that uses it.
+    """
+
+    def __init__(self, assets_dir):
+        self.assets_dir = assets_dir
+        self._lock = threading.Lock()
+        self._names = {}   # sha256 of the fetched bytes -> file name
+
+        self.written = 0
+        self.reused = 0
+        self.bytes_written = 0
+
+    def add(self, img_data, img_url, normalizer=None):
+        """File name (inside assets_dir) holding img_data, writing it on first use."""
+        source_sha = hashlib.sha256(img_data).hexdigest()
+        with self._lock:
+            name = self._names.get(source_sha)
+        if name:
+            with self._lock:
+                self.reused += 1
+            return name
+
+        if normalizer is not None:
+            img_data, mime_type = normalizer.normalize(img_data, 'html')
+        else:
+            mime_type = sniff_mime_type(img_data)
+        ext = MIME_EXTENSIONS.get(mime_type or _guess_mime_type(img_url), ".img")
+        name = f"{hashlib.sha256(img_data).hexdigest()[:32]}{ext}"
+        path = os.path.join(self.assets_dir, name)
+
+        with self._lock:
+            self._names[source_sha] = name
+            exists = os.path.exists(path)
+            if exists:
+                self.reused += 1
+        if not exists:
+            os.makedirs(self.assets_dir, exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.part"
+            with open(tmp_path, 'wb') as f:
+                f.write(img_data)
+            os.replace(tmp_path, path)
+            with self._lock:
+                self.written += 1
+                self.bytes_written += len(img_data)
+        return name
+
+    def stats(self):
+        with self._lock:
+            return {"written": self.written, "reused": self.reused, "bytes_written": self.bytes_written}
+
+
+def render_html(parsed, normalizer=None, assets=None):
+    """
+    Self-contained HTML for offline viewing and PDF printing, with images inlined as Base64.
+    Only called for formats that need it, so Word-only jobs never build this string.
+    normalizer (ImageNormalizer) downsizes/transcodes images first; the MIME type comes from the bytes.
+    With assets (AssetStore), images are written to the shared assets/ directory instead and
+    referenced by relative path, so the HTML file must sit next to that directory.
+    """
+    soup = parsed.soup
+
+    # 1. Add no-referrer meta tag to bypass anti-hotlinking
+    meta_tag = soup.new_tag('meta', attrs={"name": "referrer", "content": "no-referrer"})
+    if soup.head:
+        soup.head.insert(0, meta_tag)
+    else:
+        # Create head if missing
+        head = soup.new_tag('head')
+        head.insert(0, meta_tag)
+        soup.insert(0, head)
+
+    # 2. Fix lazy-loaded images (Embed as Base64 or link the shared asset); repeated images are handled once
+    data_uris = {}
+    for img in soup.find_all('img'):
+        img_url = img.get('data-src') or img.get('src')
+        if not img_url:
+            continue
+        img_data = parsed.images.get(img_url)
+        if isinstance(img_data, BaseException):
+            # Fallback: just use the URL if download failed
+            if 'data-src' in img.attrs:
+                img['src'] = img['data-src']
+            print(f"Failed to embed image: {img_data}")
+        elif img_data is not None:
+            if img_url not in data_uris and assets is not None:
+                data_uris[img_url] = f"{ASSETS_DIR_NAME}/{assets.add(img_data, img_url, normalizer)}"
+            elif img_url not in data_uris:
+                if normalizer is not None:
+                    img_data, mime_type = normalizer.normalize(img_data, 'html')
+                else:
+                    mime_type = sniff_mime_type(img_data)
+                b64_data = base64.b64encode(img_data).decode('utf-8')
+                data_uris[img_url] = f"data:{mime_type or _guess_mime_type(img_url)};base64,{b64_data}"
+            img['src'] = data_uris[img_url]
+
+            # Remove data-src to prevent lazy loading scripts from messing it up
+            if 'data-src' in img.attrs: del img['data-src']
+
+    return str(soup)
+
+
+def write_html(html_content, filepath):
+    with open(filepath, 'w', encoding='utf-8') as f:
+        f.write(html_content)
+
+
+def write_docx(parsed, filepath, normalizer=None):
+    """
+    Build the Word document straight from the parsed blocks and raw image bytes. Returns the number of images that could not be added.
+    Saved to a temp file and renamed, so a crash or kill never leaves a truncated .docx that later runs would skip.
+    """
+    failed = 0
+    doc = Document()
+    doc.add_heading(parsed.title, 0)
+    doc.add_paragraph(f"发布日期: {parsed.date_str}")
+
+    if parsed.has_content:
+        normalized = {}  # Images repeated within the article are converted once
+        for block in parsed.blocks:
+            if block.kind == 'image':
+                img_data = parsed.image_data(block.url)
+                if not img_data:
+                    continue
+                if normalizer is not None:
+                    # Word can't embed WebP and doesn't need full-resolution originals
+                    if block.url not in normalized:
+                        normalized[block.url] = normalizer.normalize(img_data, 'docx')[0]
+                    img_data = normalized[block.url]
+                try:
+                    doc.add_picture(BytesIO(img_data), width=DOCX_IMAGE_WIDTH)  # Fit to page
+                except Exception as e:
+                    failed += 1
+                    print(f"Error adding image: {e}")
+            elif block.kind == 'heading':
+                doc.add_heading(block.text, level=block.level)
+            else:
+                doc.add_paragraph(block.text)
+    else:
+        # Fallback if no js_content
+        doc.add_paragraph("无法解析文章内容结构，仅保存纯文本。")
+        doc.add_paragraph(parsed.plain_text())
+
+    tmp_path = f"{filepath}.part"
+    try:
+        doc.save(tmp_path)
+        os.replace(tmp_path, filepath)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return failed
@@ -0,0 +1,248 @@
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import requests
+from requests.adapters import HTTPAdapter
+
+# Defaults tuned for mp.weixin.qq.com + mmbiz.qpic.cn with the 4 download workers in app.py
+DEFAULT_POOL_CONNECTIONS = 8     # Number of distinct hosts kept in the pool manager
+DEFAULT_POOL_MAXSIZE = 8         # Max keep-alive connections per host
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 20
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RETRY_BACKOFF_BASE = 0.5         # Seconds; attempt n sleeps a random time in [0, base * 2**n]
+RETRY_BACKOFF_MAX = 8
+
+
+class RequestPolicy:
+    """
+    How requests of one endpoint class are sent: connect/read timeouts, how many times a
+    connection error, timeout or retryable status is retried (with full-jitter exponential
+    back-off), and optionally a hedged duplicate sent when the first attempt is still
+    unanswered after hedge_after seconds.
+    """
+
+    def __init__(self, connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT,
+                 retries=2, backoff_base=RETRY_BACKOFF_BASE, backoff_max=RETRY_BACKOFF_MAX,
+                 hedge_after=None, retry_statuses=RETRY_STATUSES):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self.retry_statuses = retry_statuses
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+
+# Endpoint classes: searchbiz/appmsg listing, article pages, CDN images
+DEFAULT_POLICIES = {
+    "listing": RequestPolicy(DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT, retries=2),
+    "article": RequestPolicy(DEFAULT_CONNECT_TIMEOUT, 15, retries=2),
+    "image": RequestPolicy(3, 10, retries=2, hedge_after=1.5),
+}
+
+
+class DeadlineExceeded(requests.Timeout):
+    """The overall time budget ran out before a response arrived."""
+
+
+class Deadline:
+    """Overall time budget shared by all requests of one unit of work (e.g. one article and its images)."""
+
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds if seconds else None
+
+    def remaining(self):
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.monotonic()
+
+    def check(self):
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded("Deadline exceeded")
+        return remaining
+
+
+class PooledSession:
+    """
+    Thread-safe keep-alive HTTP session shared by all scraper workers.
+    Wraps a single requests.Session whose adapters hold one connection pool per host.
+    """
+
+    def __init__(self, headers=None, pool_connections=DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT):
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_maxsize = pool_maxsize
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+
+        # pool_block=True caps concurrent connections per host at pool_maxsize;
+        # extra workers wait for a free connection instead of opening a new one.
+        self.adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=True
+        )
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+        # Hedged attempts run on their own small pool so the calling worker can wait on both
+        self._hedge_executor = None
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.hedges = 0
+        self.hedges_won = 0
+        self.deadlines_exceeded = 0
+
+    def fetch(self, url, policy, deadline=None, before_send=None, backing_off=None, after_response=None, **kwargs):
+        """
+        GET url under a RequestPolicy. Timeouts are clipped to what is left of deadline; connection
+        errors, timeouts and retryable statuses are retried with jittered back-off while the deadline
+        allows. before_send() runs before every attempt (including hedges), e.g. to take a rate-limit slot;
+        after_response(response) sees every attempt's response, e.g. to feed its status to the limiter.
+        While backing_off() returns true (the endpoint was throttled) no hedge or retry is sent.
+        Returns the response (possibly a retryable status once retries are used up) or raises.
+        """
+        attempt = 0
+        while True:
+            try:
+                response = self._send(url, policy, deadline, before_send, backing_off, kwargs)
+                if after_response is not None:
+                    after_response(response)
+                if (response.status_code not in policy.retry_statuses or attempt >= policy.retries
+                        or (backing_off is not None and backing_off())):
+                    return response
+                response.close()
+                error = None
+            except DeadlineExceeded:
+                with self._lock:
+                    self.deadlines_exceeded += 1
+                raise
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= policy.retries:
+                    raise
+                error = e
+
+            pause = policy.backoff(attempt)
+            remaining = deadline.remaining() if deadline else None
+            if remaining is not None and remaining <= pause:
+                with self._lock:
+                    self.deadlines_exceeded += 1
+                raise DeadlineExceeded(f"Deadline exceeded after {attempt + 1} attempts") from error
+            time.sleep(pause)
+            attempt += 1
+            with self._lock:
+                self.retries += 1
+
+    def _attempt_timeout(self, policy, deadline):
+        remaining = deadline.check() if deadline else None
+        if remaining is None:
+            return (policy.connect_timeout, policy.read_timeout)
+        return (min(policy.connect_timeout, remaining), min(policy.read_timeout, remaining))
+
+    def _get_once(self, url, policy, deadline, before_send, kwargs):
+        if before_send is not None:
+            before_send()
+        # Timeouts are taken after any rate-limit wait, so the request still fits the deadline
+        return self.session.get(url, timeout=self._attempt_timeout(policy, deadline), **kwargs)
+
+    def _send(self, url, policy, deadline, before_send, backing_off, kwargs):
+        """One attempt; hedged when the policy asks for it and the first request is slow."""
+        args = (url, policy, deadline, before_send, kwargs)
+        if not policy.hedge_after:
+            return self._get_once(*args)
+
+        # The primary takes its slot here, so the hedge clock only measures the request itself
+        if before_send is not None:
+            before_send()
+        executor = self._get_hedge_executor()
+        primary = executor.submit(self._get_once, url, policy, deadline, None, kwargs)
+        done, _ = wait([primary], timeout=policy.hedge_after)
+        if done or (backing_off is not None and backing_off()):
+            return primary.result()
+
+        with self._lock:
+            self.hedges += 1
+        hedge = executor.submit(self._get_once, *args)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    error = e
+                    continue
+                if future is hedge:
+                    with self._lock:
+                        self.hedges_won += 1
+                # The slower request finishes in the background; its response is just dropped
+                for other in pending:
+                    other.add_done_callback(_close_response)
+                return response
+        raise error
+
+    def _get_hedge_executor(self):
+        with self._lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(
+                    max_workers=self.pool_maxsize * 2, thread_name_prefix="hedge"
+                )
+            return self._hedge_executor
+
+    def stats(self):
+        """
+        Connection reuse counters aggregated over all host pools.
+        Returns: dict with requests, connections opened and reused, per host.
+        """
+        hosts = {}
+        total_requests = 0
+        total_connections = 0
+        pools = self.adapter.poolmanager.pools
+        # RecentlyUsedContainer is guarded by its own lock; copy keys before iterating
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = f"{pool.host}:{pool.port}" if pool.port else pool.host
+            entry = hosts.setdefault(host, {"requests": 0, "connections": 0, "reused": 0})
+            entry["requests"] += pool.num_requests
+            entry["connections"] += pool.num_connections
+            entry["reused"] = max(entry["requests"] - entry["connections"], 0)
+            total_requests += pool.num_requests
+            total_connections += pool.num_connections
+
+        with self._lock:
+            policy_stats = {
+                "retries": self.retries,
+                "hedges": self.hedges,
+                "hedges_won": self.hedges_won,
+                "deadlines_exceeded": self.deadlines_exceeded
+            }
+        return dict({
+            "requests": total_requests,
+            "connections_opened": total_connections,
+            "connections_reused": max(total_requests - total_connections, 0),
+            "hosts": hosts
+        }, **policy_stats)
+
+    def close(self):
+        with self._lock:
+            executor, self._hedge_executor = self._hedge_executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+        self.session.close()
+
+
+def _close_response(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
@@ -0,0 +1,133 @@
+import threading
+from io import BytesIO
+
+# Pillow is optional: without it images are only sniffed for their real MIME type
+try:
+    from PIL import Image
+    HAS_PILLOW = True
+except ImportError:
+    HAS_PILLOW = False
+
+# Maximum pixel width per output target. 'html' also covers PDF, which is printed from the HTML render;
+# 'docx' matches DOCX_IMAGE_WIDTH (5.5") at 200 dpi.
+DEFAULT_MAX_WIDTHS = {"html": 1080, "docx": 1100}
+JPEG_QUALITY = 85
+
+# Formats each target can display as-is
+SUPPORTED_MIME_TYPES = {
+    "html": {"image/jpeg", "image/png", "image/gif", "image/webp", "image/svg+xml"},
+    "docx": {"image/jpeg", "image/png", "image/gif", "image/bmp"},
+}
+
+
+def sniff_mime_type(data):
+    """Real image type from the leading bytes, or None if unrecognized."""
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data.startswith(b"BM"):
+        return "image/bmp"
+    head = data[:256].lstrip().lower()
+    if head.startswith(b"<svg") or (head.startswith(b"<?xml") and b"<svg" in data[:1024].lower()):
+        return "image/svg+xml"
+    return None
+
+
+class ImageNormalizer:
+    """
+    Prepares fetched images for an output target: detects the real format from the bytes,
+    transcodes formats the target can't show (WebP in Word) and downsamples images wider than
+    the target's maximum width. Keeps per-job counters of the bytes saved.
+    """
+
+    def __init__(self, max_widths=None, quality=JPEG_QUALITY):
+        self.max_widths = dict(DEFAULT_MAX_WIDTHS)
+        self.max_widths.update(max_widths or {})
+        self.quality = quality
+
+        self._lock = threading.Lock()
+        self.images = 0
+        self.transcoded = 0
+        self.downscaled = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def normalize(self, data, target):
+        """(bytes, mime_type) of the image prepared for target ('html' or 'docx')."""
+        mime_type = sniff_mime_type(data)
+        out, out_type = data, mime_type
+        try:
+            out, out_type = self._convert(data, mime_type, target)
+        except Exception as e:
+            print(f"Error normalizing image: {e}")
+
+        with self._lock:
+            self.images += 1
+            self.bytes_in += len(data)
+            self.bytes_out += len(out)
+            if out_type != mime_type:
+                self.transcoded += 1
+        return out, out_type
+
+    def _convert(self, data, mime_type, target):
+        if not HAS_PILLOW or mime_type == "image/svg+xml":
+            return data, mime_type
+
+        supported = mime_type in SUPPORTED_MIME_TYPES[target]
+        max_width = self.max_widths.get(target)
+        img = Image.open(BytesIO(data))
+
+        # Animated GIFs would lose their animation; only convert them when the target can't show GIF
+        if getattr(img, "is_animated", False) and supported:
+            return data, mime_type
+
+        too_wide = max_width and img.width > max_width
+        if supported and not too_wide:
+            return data, mime_type
+
+        if too_wide:
+            img.thumbnail((max_width, max_width * img.height // img.width or 1), Image.LANCZOS)
+
+        # Keep transparency as PNG, everything else becomes JPEG
+        has_alpha = img.mode in ("RGBA", "LA", "P") and ("transparency" in img.info or img.mode != "P")
+        buf = BytesIO()
+        if mime_type == "image/png" or has_alpha:
+            img.save(buf, "PNG", optimize=True)
+            out_type = "image/png"
+        else:
+            img.convert("RGB").save(buf, "JPEG", quality=self.quality, optimize=True)
+            out_type = "image/jpeg"
+        out = buf.getvalue()
+
+        # Downscaling that doesn't pay off: keep the original if the target can show it
+        if supported and len(out) >= len(data):
+            return data, mime_type
+        if too_wide:
+            with self._lock:
+                self.downscaled += 1
+        return out, out_type
+
+    def add_stats(self, stats):
+        """Merge counters collected by another normalizer (e.g. in a worker process)."""
+        with self._lock:
+            self.images += stats["images"]
+            self.transcoded += stats["transcoded"]
+            self.downscaled += stats["downscaled"]
+            self.bytes_in += stats["bytes_in"]
+            self.bytes_out += stats["bytes_out"]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "images": self.images,
+                "transcoded": self.transcoded,
+                "downscaled": self.downscaled,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "bytes_saved": self.bytes_in - self.bytes_out
+            }
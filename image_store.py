@@ -0,0 +1,177 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Constants
+IMAGE_STORE_DIR = ".image_cache"
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # 1 GB
+
+# Query parameters WeChat appends for tracking / lazy loading; they don't change the image bytes
+VOLATILE_PARAMS = {"from", "wxfrom", "wx_lazy", "wx_co", "retryload", "watermark"}
+
+
+def normalize_image_url(url):
+    """Canonical form of an image URL so the same mmbiz.qpic.cn image maps to one key."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if not host.endswith("qpic.cn"):
+        return urlunsplit((parts.scheme, host, parts.path, parts.query, ""))
+
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if k not in VOLATILE_PARAMS)
+    return urlunsplit(("https", host, parts.path, urlencode(query), ""))
+
+
+class ImageStore:
+    """
+    Persistent content-addressed image cache shared by all scraper workers.
+    Blobs are stored once per content hash; an SQLite index maps normalized URLs
+    to blobs and tracks last access for LRU eviction under a total size cap.
+    """
+
+    def __init__(self, root=IMAGE_STORE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS images ("
+            "url_key TEXT PRIMARY KEY, sha256 TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS images_lru ON images (last_access)")
+        self._db.commit()
+
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.bytes_fetched = 0
+        self.evictions = 0
+
+    def _blob_path(self, sha):
+        return os.path.join(self.root, "objects", sha[:2], sha)
+
+    def _lookup(self, url_key):
+        """Read the blob for url_key and bump its last access time. Returns bytes or None."""
+        with self._lock:
+            row = self._db.execute("SELECT sha256 FROM images WHERE url_key = ?", (url_key,)).fetchone()
+            if not row:
+                return None
+            try:
+                with open(self._blob_path(row[0]), "rb") as f:
+                    data = f.read()
+            except OSError:
+                # Blob removed behind our back; forget the entry
+                self._db.execute("DELETE FROM images WHERE url_key = ?", (url_key,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE images SET last_access = ? WHERE url_key = ?", (time.time(), url_key))
+            self._db.commit()
+            return data
+
+    def _count(self, data):
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.bytes_saved += len(data)
+
+    def get(self, url):
+        """Return cached bytes for url, or None. Counts a hit or a miss."""
+        data = self._lookup(normalize_image_url(url))
+        self._count(data)
+        return data
+
+    def put(self, url, data):
+        """Store freshly downloaded bytes for url and evict old entries if over the cap."""
+        url_key = normalize_image_url(url)
+        sha = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(sha)
+        with self._lock:
+            self.bytes_fetched += len(data)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            self._db.execute(
+                "INSERT OR REPLACE INTO images (url_key, sha256, size, last_access) VALUES (?, ?, ?, ?)",
+                (url_key, sha, len(data), time.time())
+            )
+            self._db.commit()
+            self._evict()
+
+    def fetch(self, url, download):
+        """
+        Return the image for url from the store, calling download(url) only on a miss.
+        Concurrent misses for the same URL wait for a single download.
+        """
+        url_key = normalize_image_url(url)
+        while True:
+            data = self._lookup(url_key)
+            if data is not None:
+                self._count(data)
+                return data
+            with self._lock:
+                event = self._pending.get(url_key)
+                if event is None:
+                    event = self._pending[url_key] = threading.Event()
+                    self.misses += 1
+                    break
+            event.wait()
+
+        try:
+            data = download(url)
+            if data:
+                self.put(url, data)
+            return data
+        finally:
+            with self._lock:
+                self._pending.pop(url_key, None)
+            event.set()
+
+    def _evict(self):
+        """Drop least recently used entries until the distinct blobs fit in max_bytes. Caller holds the lock."""
+        total = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT sha256, size FROM images)"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for url_key, sha, size in self._db.execute(
+                "SELECT url_key, sha256, size FROM images ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM images WHERE url_key = ?", (url_key,))
+            self.evictions += 1
+            still_used = self._db.execute("SELECT 1 FROM images WHERE sha256 = ? LIMIT 1", (sha,)).fetchone()
+            if not still_used:
+                try:
+                    os.remove(self._blob_path(sha))
+                except OSError:
+                    pass
+                total -= size
+        self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "bytes_saved": self.bytes_saved,
+                "bytes_fetched": self.bytes_fetched,
+                "evictions": self.evictions
+            }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,350 @@
+import os
+import time
+import uuid
+import secrets
+import hashlib
+import tempfile
+import threading
+from contextlib import closing
+from collections import OrderedDict, deque
+
+from wechat_scraper import WeChatScraper
+from download_pipeline import DownloadPipeline
+from archive_writer import IncrementalZip
+from docx_pool import shared_docx_pool
+from progress_events import ProgressAggregator
+
+# Constants
+DEFAULT_MAX_JOBS = 2        # Jobs running at once across all sessions (each has its own Chrome pool)
+DEFAULT_JOB_WORKERS = 4     # Download threads per job
+JOB_TTL = 6 * 3600          # Finished jobs (and their ZIPs) are forgotten after this many seconds
+LOG_LINES = 50
+
+# Finished archives go to Streamlit's static folder, which streams them to the browser from disk
+# (needs server.enableStaticServing, see .streamlit/config.toml)
+DOWNLOAD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "downloads")
+DOWNLOAD_URL = "app/static/downloads"
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+
+class Job:
+    """One download job and its progress, updated by the runner thread and read by the UI."""
+
+    def __init__(self, owner, params):
+        self.id = uuid.uuid4().hex[:12]
+        self.owner = owner
+        self.params = params
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+        self.listed = 0
+        self.processed = 0
+        self.downloaded = 0
+        self.skipped = 0
+        self.listing_done = False
+        self.current = None
+        self.error = None
+        self.result = None
+        self.metrics = None     # Stage timings and counters, set when the job ends (also on failure/cancel)
+
+        self._lock = threading.Lock()
+        self._logs = deque(maxlen=LOG_LINES)
+        self.cancel_event = threading.Event()
+        # Typed events from the scraper, including its download threads (per-image and per-format progress)
+        self.progress = ProgressAggregator()
+
+    def log(self, message):
+        with self._lock:
+            self._logs.append(message)
+
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+    def snapshot(self):
+        """Consistent copy of the job state for the UI."""
+        with self._lock:
+            return {
+                "id": self.id,
+                "account": self.params["account_name"],
+                "status": self.status,
+                "listed": self.listed,
+                "processed": self.processed,
+                "downloaded": self.downloaded,
+                "skipped": self.skipped,
+                "listing_done": self.listing_done,
+                "current": self.current,
+                "error": self.error,
+                "result": self.result,
+                "metrics": self.metrics,
+                "logs": list(self._logs),
+                "progress": self.progress.snapshot(),
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at
+            }
+
+    def _record(self, article, success):
+        with self._lock:
+            self.processed += 1
+            self.current = article['title']
+            if success:
+                self.downloaded += 1
+            else:
+                self.skipped += 1
+
+
+def run_download_job(job, workers=DEFAULT_JOB_WORKERS):
+    """Search, list, download and zip one account. Runs on a runner thread, never in the Streamlit script."""
+    p = job.params
+    cookie, token = p["credentials"][0]
+    docx_pool = None
+    if 'docx' in p["formats"]:
+        # Word building goes to the shared process pool; enough fetch threads to keep every core busy
+        docx_pool = shared_docx_pool()
+        workers = max(workers, docx_pool.processes)
+    scraper = WeChatScraper(cookie, token, pool_maxsize=workers * 2, pdf_workers=min(workers, DEFAULT_JOB_WORKERS),
+                            credentials=p["credentials"], docx_pool=docx_pool,
+                            html_assets='html' in p["formats"],
+                            on_event=job.progress.emit, offline=p.get("offline", False))
+    archive = None
+    try:
+        # 1. Get FakeID
+        fakeid = scraper.get_fakeid(p["account_name"], job.log, stop=job.cancel_event)
+        if job.cancel_event.is_set():
+            return
+        if not fakeid:
+            job.error = "account_not_found"
+            return
+
+        # 2. List and download (listing overlaps downloading unless the async engine is used)
+        os.makedirs(p["target_dir"], exist_ok=True)
+        os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+        zip_name = f"{secrets.token_urlsafe(16)}.zip"
+        archive = IncrementalZip(os.path.join(DOWNLOAD_DIR, zip_name), p["target_dir"])
+
+        def finished(article, success):
+            # Each article goes into the ZIP as soon as it is done
+            for path in scraper.output_files(article, p["target_dir"], p["formats"]):
+                archive.add(path)
+            job._record(article, success)
+
+        if p.get("use_async") and not p.get("offline"):
+            from async_engine import AsyncDownloadEngine
+            articles = scraper.get_articles(fakeid, job.log, date_range=p["date_range"], stop=job.cancel_event)
+            job.listed = len(articles)
+            job.listing_done = True
+            AsyncDownloadEngine(scraper).run(articles, p["target_dir"], p["formats"], on_result=finished,
+                                             cancel_event=job.cancel_event)
+        else:
+            pipeline = DownloadPipeline(scraper, max_workers=workers)
+            # Closed explicitly so the pipeline's workers are joined before the scraper is closed below
+            pipeline_events = pipeline.run(fakeid, p["target_dir"], p["formats"], date_range=p["date_range"],
+                                           cancel_event=job.cancel_event)
+            with closing(pipeline_events):
+                for event in pipeline_events:
+                    if job.cancel_event.is_set():
+                        break
+                    if event[0] == 'log':
+                        job.log(event[1])
+                    elif event[0] == 'listed':
+                        job.listed = event[2]
+                    elif event[0] == 'listing_done':
+                        job.listing_done = True
+                    elif event[0] == 'done':
+                        _, article, success, exc = event
+                        if exc is not None:
+                            job.log(f"Error downloading {article['title']}: {exc}")
+                        finished(article, success and exc is None)
+
+        if job.cancel_event.is_set() or not job.listed:
+            return
+
+        # 3. Finish the ZIP (only files not added along the way are read now)
+        zip_path = archive.close()
+
+        rl_stats = scraper.rate_limit_stats()
+        throttled = sum(rl_stats[k]['throttled_seconds'] for k in ('article', 'image'))
+        throttled += sum(login[k]['throttled_seconds'] for login in rl_stats['logins'] for k in ('searchbiz', 'appmsg'))
+        job.result = {
+            "zip_path": zip_path,
+            "zip_name": zip_name,
+            "zip_url": f"{DOWNLOAD_URL}/{zip_name}",
+            "zip_size": os.path.getsize(zip_path),
+            "target_dir": p["target_dir"],
+            "connections": scraper.connection_stats(),
+            "throttled_seconds": throttled,
+            "logins": len(rl_stats['logins']),
+            "image_store": scraper.image_store_stats(),
+            "image_normalizer": scraper.image_normalizer_stats()
+        }
+    finally:
+        if archive is not None:
+            # No-op once the archive is closed; drops the partial file on cancel or error
+            archive.abort()
+        job.metrics = scraper.metrics_report()
+        scraper.close()
+
+
+class JobRunner:
+    """
+    Process-wide job queue served by a fixed number of runner threads, independent of any
+    Streamlit script run: jobs survive reruns and reloads and are looked up again by id.
+    Queued jobs are taken round-robin across owners so one session cannot starve the others.
+    """
+
+    def __init__(self, max_jobs=DEFAULT_MAX_JOBS, workers_per_job=DEFAULT_JOB_WORKERS, root=None, execute=None):
+        self.max_jobs = max(1, max_jobs)
+        self.workers_per_job = workers_per_job
+        self.root = root or tempfile.mkdtemp(prefix="wechat_jobs_")
+        self.execute = execute or run_download_job
+
+        self._cond = threading.Condition()
+        self._jobs = {}
+        self._queues = OrderedDict()   # owner -> deque of queued jobs
+        self._threads = []
+
+    def owner_dir(self, owner):
+        """Output folder of an owner; stable across jobs so already downloaded files are skipped."""
+        return os.path.join(self.root, hashlib.sha1(owner.encode("utf-8")).hexdigest()[:12])
+
+    def submit(self, owner, account_name, formats, date_range, credentials, use_async=False, offline=False):
+        """
+        Queue a job and return its id. An active job of the same owner for the same account is reused.
+        offline re-exports from the local page and image caches without any request to WeChat.
+        """
+        with self._cond:
+            self._prune()
+            for job in self._jobs.values():
+                if job.owner == owner and job.active and job.params["account_name"] == account_name:
+                    return job.id
+
+            owner_dir = self.owner_dir(owner)
+            job = Job(owner, {
+                "account_name": account_name,
+                "formats": list(formats),
+                "date_range": date_range,
+                "credentials": list(credentials),
+                "use_async": use_async,
+                "offline": offline,
+                "target_dir": os.path.join(owner_dir, account_name)
+            })
+            self._jobs[job.id] = job
+            self._queues.setdefault(owner, deque()).append(job)
+            self._start_threads()
+            self._cond.notify()
+            return job.id
+
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def jobs_for(self, owner):
+        """The owner's jobs, newest first."""
+        with self._cond:
+            jobs = [job for job in self._jobs.values() if job.owner == owner]
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+
+    def queue_position(self, job_id):
+        """Number of queued jobs that will start before job_id (0 = next), or None if not queued."""
+        with self._cond:
+            queues = OrderedDict((owner, deque(jobs)) for owner, jobs in self._queues.items())
+        position = 0
+        while queues:
+            owner, jobs = queues.popitem(last=False)
+            job = jobs.popleft()
+            if job.id == job_id:
+                return position
+            position += 1
+            if jobs:
+                queues[owner] = jobs
+        return None
+
+    def cancel(self, job_id):
+        """Drop a queued job, or ask a running one to stop after the articles in progress."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or not job.active:
+                return False
+            job.cancel_event.set()
+            if job.status == QUEUED:
+                queue = self._queues.get(job.owner)
+                if queue and job in queue:
+                    queue.remove(job)
+                    if not queue:
+                        del self._queues[job.owner]
+                job.status = CANCELLED
+                job.finished_at = time.time()
+            return True
+
+    def _start_threads(self):
+        # Called with the lock held; threads are started lazily up to max_jobs
+        while len(self._threads) < self.max_jobs:
+            thread = threading.Thread(target=self._serve, daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _next_job(self):
+        with self._cond:
+            while not self._queues:
+                self._cond.wait()
+            owner, queue = self._queues.popitem(last=False)
+            job = queue.popleft()
+            if queue:
+                # Owner goes to the back of the line
+                self._queues[owner] = queue
+            job.status = RUNNING
+            job.started_at = time.time()
+            return job
+
+    def _serve(self):
+        while True:
+            job = self._next_job()
+            try:
+                self.execute(job, self.workers_per_job)
+            except Exception as e:
+                job.error = str(e)
+                job.log(f"Job failed: {e}")
+            with self._cond:
+                if job.cancel_event.is_set():
+                    job.status = CANCELLED
+                elif job.error:
+                    job.status = FAILED
+                else:
+                    job.status = DONE
+                job.finished_at = time.time()
+
+    def _prune(self):
+        # Called with the lock held
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if job.finished_at and now - job.finished_at > JOB_TTL:
+                del self._jobs[job_id]
+                zip_path = (job.result or {}).get("zip_path")
+                if zip_path and os.path.exists(zip_path):
+                    os.remove(zip_path)
+
+    def stats(self):
+        with self._cond:
+            jobs = list(self._jobs.values())
+        return {
+            "max_jobs": self.max_jobs,
+            "running": sum(1 for job in jobs if job.status == RUNNING),
+            "queued": sum(1 for job in jobs if job.status == QUEUED)
+        }
+
+
+_shared_runner = None
+_shared_lock = threading.Lock()
+
+
+def shared_runner():
+    """The job runner shared by every Streamlit session in this process."""
+    global _shared_runner
+    with _shared_lock:
+        if _shared_runner is None:
+            _shared_runner = JobRunner()
+        return _shared_runner
@@ -0,0 +1,132 @@
+import time
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Pipeline stages timed per job
+STAGES = (
+    "search",          # searchbiz requests
+    "listing",         # appmsg list_ex requests
+    "throttle_wait",   # time spent waiting for a rate-limit slot
+    "article_fetch",
+    "image_fetch",
+    "parse",           # BeautifulSoup parsing and block extraction
+    "html_render",
+    "docx_build",
+    "pdf_render",
+)
+
+METRIC_PREFIX = "wechat_scraper"
+
+
+class StageMetrics:
+    """
+    Thread-safe per-stage timers and named counters of one job.
+    With a parent, every observation is also added to it (the process-wide totals).
+    """
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._counters = {}
+        self.started_at = time.time()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            count, total, peak = self._stages.get(stage, (0, 0.0, 0.0))
+            self._stages[stage] = (count + 1, total + seconds, max(peak, seconds))
+        if self.parent is not None:
+            self.parent.observe(stage, seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        """with metrics.timer('parse'): ..."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+        if self.parent is not None:
+            self.parent.count(name, value)
+
+    def counter(self, name):
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def report(self):
+        """JSON-serializable job report."""
+        with self._lock:
+            stages = {
+                stage: {
+                    "count": count,
+                    "total_s": round(total, 3),
+                    "avg_ms": round(total / count * 1000, 1) if count else 0.0,
+                    "max_ms": round(peak * 1000, 1)
+                }
+                for stage, (count, total, peak) in self._stages.items()
+            }
+            counters = dict(self._counters)
+        return {
+            "started_at": self.started_at,
+            "elapsed_s": round(time.time() - self.started_at, 3),
+            "stages": stages,
+            "counters": counters
+        }
+
+    def prometheus(self, prefix=METRIC_PREFIX):
+        """Prometheus text exposition format (cumulative counters and stage summaries)."""
+        report = self.report()
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent per pipeline stage.",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for stage, data in sorted(report["stages"].items()):
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {data["total_s"]}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {data["count"]}')
+        for name, value in sorted(report["counters"].items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+
+_shared_metrics = None
+_shared_lock = threading.Lock()
+
+
+def shared_metrics():
+    """Process-wide totals every scraper's metrics roll up into."""
+    global _shared_metrics
+    with _shared_lock:
+        if _shared_metrics is None:
+            _shared_metrics = StageMetrics()
+        return _shared_metrics
+
+
+def start_metrics_server(port, host="0.0.0.0", metrics=None):
+    """Serve the process-wide metrics at http://host:port/metrics for a Prometheus scraper."""
+    source = metrics or shared_metrics()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = source.prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,157 @@
+import os
+import re
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+
+from download_manifest import article_key
+
+# Constants
+PAGE_CACHE_DIR = ".page_cache"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MB of compressed pages
+COMPRESS_LEVEL = 6                      # Article pages are mostly inline script/style and compress ~8x
+# Only real article pages are cached; verification pages and deleted-article stubs have no body
+ARTICLE_BODY = re.compile(r'id\s*=\s*["\']js_content["\']')
+
+
+def is_article_page(page_html):
+    return ARTICLE_BODY.search(page_html) is not None
+
+
+class PageCache:
+    """
+    Persistent cache of raw article pages, so articles can be exported again (new formats,
+    changed converters) without downloading them. Pages are keyed by article_key(link),
+    stored zlib-compressed as one file each, and evicted least recently used under a size cap.
+    Only pages with an article body (#js_content) are stored or served.
+    """
+
+    def __init__(self, root=PAGE_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(root, "pages"), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "key TEXT PRIMARY KEY, link TEXT NOT NULL, size INTEGER NOT NULL, raw_size INTEGER NOT NULL, "
+            "fetched_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS pages_lru ON pages (last_access)")
+        self._db.commit()
+
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+
+    def _page_path(self, key):
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, "pages", name[:2], f"{name}.z")
+
+    def has(self, link):
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM pages WHERE key = ?", (article_key(link),)).fetchone()
+            return row is not None
+
+    def get(self, link, max_age=None):
+        """
+        Cached page text for link, or None. Counts a hit or a miss.
+        With max_age (seconds), pages downloaded longer ago than that count as a miss.
+        """
+        key = article_key(link)
+        with self._lock:
+            row = self._db.execute("SELECT fetched_at FROM pages WHERE key = ?", (key,)).fetchone()
+            data = None
+            if row and (max_age is None or time.time() - row[0] <= max_age):
+                try:
+                    with open(self._page_path(key), "rb") as f:
+                        data = zlib.decompress(f.read())
+                    page_html = data.decode("utf-8")
+                    if not is_article_page(page_html):
+                        raise ValueError("no article body")
+                except (OSError, zlib.error, ValueError):
+                    # Page removed or damaged behind our back, or a stub without article body; forget the entry
+                    data = None
+                    self._db.execute("DELETE FROM pages WHERE key = ?", (key,))
+                    self._db.commit()
+                    try:
+                        os.remove(self._page_path(key))
+                    except OSError:
+                        pass
+                else:
+                    self._db.execute("UPDATE pages SET last_access = ? WHERE key = ?", (time.time(), key))
+                    self._db.commit()
+
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.bytes_saved += len(data)
+        return page_html
+
+    def put(self, link, page_html):
+        """
+        Store a freshly downloaded page and evict old entries if over the cap.
+        Pages without an article body are not stored; returns whether the page was.
+        """
+        if not is_article_page(page_html):
+            return False
+        key = article_key(link)
+        raw = page_html.encode("utf-8")
+        data = zlib.compress(raw, COMPRESS_LEVEL)
+        path = self._page_path(key)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            now = time.time()
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages (key, link, size, raw_size, fetched_at, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, link, len(data), len(raw), now, now)
+            )
+            self._db.commit()
+            self._evict()
+        return True
+
+    def _evict(self):
+        """Drop least recently used pages until the cache fits in max_bytes. Caller holds the lock."""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, size in self._db.execute("SELECT key, size FROM pages ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM pages WHERE key = ?", (key,))
+            try:
+                os.remove(self._page_path(key))
+            except OSError:
+                pass
+            total -= size
+            self.evictions += 1
+        self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            pages, size, raw_size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(raw_size), 0) FROM pages"
+            ).fetchone()
+            return {
+                "pages": pages,
+                "bytes_stored": size,
+                "bytes_uncompressed": raw_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "bytes_saved": self.bytes_saved,
+                "evictions": self.evictions
+            }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,189 @@
+import os
+import secrets
+import mimetypes
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# One headless Chrome per core (capped) is enough to keep the download workers busy
+DEFAULT_POOL_SIZE = min(4, os.cpu_count() or 1)
+
+
+class RendererPool:
+    """
+    Pool of headless Chrome drivers used for Page.printToPDF.
+    Drivers are created lazily up to `size`, checked out by one thread at a time,
+    and a driver that fails during a render is quit and replaced on next checkout.
+    """
+
+    def __init__(self, create_driver, size=DEFAULT_POOL_SIZE):
+        self.create_driver = create_driver
+        self.size = max(1, size)
+        self._cond = threading.Condition()
+        self._idle = []
+        self._created = 0
+        self._closed = False
+
+        self.renders = 0
+        self.restarts = 0
+
+    def acquire(self):
+        """Check out a driver, starting a new one if the pool isn't full. Returns None if Chrome can't start."""
+        with self._cond:
+            while True:
+                if self._closed:
+                    return None
+                if self._idle:
+                    return self._idle.pop()
+                if self._created < self.size:
+                    self._created += 1
+                    break
+                self._cond.wait()
+
+        driver = None
+        try:
+            driver = self.create_driver()
+        finally:
+            if driver is None:
+                with self._cond:
+                    self._created -= 1
+                    self._cond.notify()
+        return driver
+
+    def release(self, driver, broken=False):
+        """Return a driver to the pool. Broken drivers are quit so a fresh one replaces them."""
+        if broken or self._closed:
+            self._quit(driver)
+            with self._cond:
+                self._created -= 1
+                if broken:
+                    self.restarts += 1
+                self._cond.notify()
+            return
+
+        with self._cond:
+            self.renders += 1
+            self._idle.append(driver)
+            self._cond.notify()
+
+    @contextmanager
+    def renderer(self):
+        """
+        with pool.renderer() as driver: ...
+        Yields None if no driver could be started. An exception inside the block marks the driver broken.
+        """
+        driver = self.acquire()
+        if driver is None:
+            yield None
+            return
+        try:
+            yield driver
+        except Exception:
+            self.release(driver, broken=True)
+            raise
+        else:
+            self.release(driver)
+
+    def _quit(self, driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Error closing driver: {e}")
+
+    def close(self):
+        """Quit idle drivers. Drivers still checked out are quit when released."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+            self._closed = True
+            self._cond.notify_all()
+        for driver in idle:
+            self._quit(driver)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "running": self._created,
+                "idle": len(self._idle),
+                "renders": self.renders,
+                "restarts": self.restarts
+            }
+
+
+class DocumentServer:
+    """
+    Loopback HTTP server that hands in-memory HTML documents to Chrome.
+    Each document is reachable under an unguessable one-off path only while it is being rendered,
+    so PDF output never needs a temporary HTML file on disk. A document may come with an asset
+    directory, whose files are served next to it so relative image paths resolve.
+    """
+
+    def __init__(self):
+        self._documents = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def _start(self):
+        documents = self._documents
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                # /<token>/index.html or /<token>/<asset dir name>/<file>
+                parts = self.path.split("?", 1)[0].split("/")
+                entry = documents.get(parts[1]) if len(parts) > 2 else None
+                if entry is None:
+                    self.send_error(404)
+                    return
+                body, asset_dir = entry
+                if parts[2:] == ["index.html"]:
+                    content_type = "text/html; charset=utf-8"
+                elif asset_dir and len(parts) == 4 and parts[2] == os.path.basename(asset_dir) and parts[3] not in ("", ".", ".."):
+                    try:
+                        with open(os.path.join(asset_dir, parts[3]), "rb") as f:
+                            body = f.read()
+                    except OSError:
+                        self.send_error(404)
+                        return
+                    content_type = mimetypes.guess_type(parts[3])[0] or "application/octet-stream"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    @contextmanager
+    def serve(self, html_content, asset_dir=None):
+        """
+        with server.serve(html) as url: driver.get(url)
+        asset_dir: directory whose files the document references as "<basename of asset_dir>/<file>".
+        """
+        with self._lock:
+            if self._server is None:
+                self._server = self._start()
+            port = self._server.server_address[1]
+            token = secrets.token_urlsafe(16)
+            self._documents[token] = (html_content.encode("utf-8"), asset_dir)
+        try:
+            yield f"http://127.0.0.1:{port}/{token}/index.html"
+        finally:
+            with self._lock:
+                self._documents.pop(token, None)
+
+    def close(self):
+        with self._lock:
+            server, self._server = self._server, None
+        if server is not None:
+            server.shutdown()
+            server.server_close()
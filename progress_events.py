@@ -0,0 +1,149 @@
+import time
+import threading
+from collections import OrderedDict, deque
+
+from download_manifest import article_key
+
+# Event kinds emitted by WeChatScraper
+SEARCH = "search"                    # name
+ACCOUNT_FOUND = "account_found"      # name, cached
+ACCOUNT_NOT_FOUND = "account_not_found"
+PAGE = "page"                        # page, listed (articles listed so far)
+RATE_LIMITED = "rate_limited"        # endpoint, penalty, credential
+LISTING_STOPPED = "listing_stopped"  # reason: 'end', 'date_range', 'indexed', 'cache', 'rate_limit', 'no_login', 'error', 'cancelled'
+ARTICLE_START = "article_start"      # formats
+ARTICLE_FETCHED = "article_fetched"  # bytes, images (distinct images to fetch)
+IMAGE = "image"                      # done, total, ok
+FORMAT_DONE = "format_done"          # format
+FORMAT_FAILED = "format_failed"      # format, error
+ARTICLE_SKIPPED = "article_skipped"  # all requested formats already exist
+ARTICLE_DONE = "article_done"        # success
+ERROR = "error"                      # message
+
+RECENT_EVENTS = 50
+
+
+class ProgressEvent:
+    """One typed progress event. article_id is the stable article key (None for account-level events)."""
+
+    def __init__(self, kind, article=None, **fields):
+        self.kind = kind
+        self.time = time.time()
+        self.article_id = article_key(article['link']) if article else None
+        self.title = article['title'] if article else None
+        self.fields = fields
+
+    def get(self, name, default=None):
+        return self.fields.get(name, default)
+
+    def to_dict(self):
+        record = {"kind": self.kind, "time": round(self.time, 3), "article_id": self.article_id, "title": self.title}
+        record.update(self.fields)
+        return record
+
+
+class ProgressAggregator:
+    """
+    Folds events from any thread into one progress state: account/listing status, counters,
+    the articles currently in flight (stage, images done/total, formats written) and the recent
+    notable events. Emitting only updates that state; readers redraw from wait_for_change() at
+    their own pace, so a burst of per-image events between two redraws costs a single redraw.
+    """
+
+    def __init__(self, recent=RECENT_EVENTS):
+        self._cond = threading.Condition()
+        self._version = 0
+
+        self.account = None
+        self.pages = 0
+        self.listed = 0
+        self.listing_stopped = None
+        self.rate_limited_until = 0.0
+        self.counters = {"downloaded": 0, "skipped": 0, "failed": 0, "images": 0, "images_failed": 0, "formats": 0}
+        self.in_flight = OrderedDict()
+        self.recent = deque(maxlen=recent)
+
+    def emit(self, event):
+        """Event sink for WeChatScraper(on_event=...). Thread-safe and cheap: no rendering happens here."""
+        with self._cond:
+            self._apply(event)
+            self._version += 1
+            self._cond.notify_all()
+
+    def _apply(self, event):
+        # Called with the lock held
+        kind = event.kind
+        article = self.in_flight.get(event.article_id) if event.article_id else None
+
+        if kind == SEARCH:
+            self.account = {"name": event.get("name"), "found": None}
+        elif kind in (ACCOUNT_FOUND, ACCOUNT_NOT_FOUND):
+            self.account = {"name": event.get("name"), "found": kind == ACCOUNT_FOUND}
+        elif kind == PAGE:
+            self.pages = event.get("page", self.pages)
+            self.listed = max(self.listed, event.get("listed", 0))
+        elif kind == RATE_LIMITED:
+            self.rate_limited_until = event.time + event.get("penalty", 0)
+        elif kind == LISTING_STOPPED:
+            self.listing_stopped = event.get("reason")
+        elif kind == ARTICLE_START:
+            self.in_flight[event.article_id] = {
+                "title": event.title, "stage": "fetch", "images_done": 0, "images_total": None,
+                "formats": event.get("formats", []), "formats_done": [], "started_at": event.time
+            }
+        elif kind == ARTICLE_FETCHED and article:
+            article["stage"] = "images"
+            article["images_total"] = event.get("images")
+        elif kind == IMAGE:
+            self.counters["images" if event.get("ok") else "images_failed"] += 1
+            if article:
+                article["images_done"] = event.get("done")
+                article["images_total"] = event.get("total")
+        elif kind == FORMAT_DONE:
+            self.counters["formats"] += 1
+            if article:
+                article["stage"] = "write"
+                article["formats_done"].append(event.get("format"))
+        elif kind == ARTICLE_SKIPPED:
+            self.counters["skipped"] += 1
+            self.in_flight.pop(event.article_id, None)
+        elif kind == ARTICLE_DONE:
+            self.counters["downloaded" if event.get("success") else "failed"] += 1
+            self.in_flight.pop(event.article_id, None)
+
+        # Per-image and per-stage events only update state; everything else is worth showing as a line
+        if kind not in (IMAGE, ARTICLE_START, ARTICLE_FETCHED, FORMAT_DONE):
+            self.recent.append(event.to_dict())
+
+    def snapshot(self):
+        """Consistent, JSON-serializable copy of the progress state."""
+        with self._cond:
+            return self._snapshot()
+
+    def _snapshot(self):
+        return {
+            "version": self._version,
+            "account": dict(self.account) if self.account else None,
+            "pages": self.pages,
+            "listed": self.listed,
+            "listing_stopped": self.listing_stopped,
+            "rate_limited_for": max(0.0, round(self.rate_limited_until - time.time(), 1)),
+            "counters": dict(self.counters),
+            "in_flight": [
+                dict(state, article_id=article_id, formats_done=list(state["formats_done"]))
+                for article_id, state in self.in_flight.items()
+            ],
+            "recent": list(self.recent)
+        }
+
+    def wait_for_change(self, version, timeout):
+        """
+        Block until the state has moved past version (the 'version' of the caller's last snapshot;
+        None for the first call) or timeout passes. Returns the new snapshot, or None if unchanged.
+        """
+        with self._cond:
+            if version is not None:
+                self._cond.wait_for(lambda: self._version != version, timeout)
+                if self._version == version:
+                    return None
+            return self._snapshot()
@@ -0,0 +1,178 @@
+import time
+import threading
+from collections import deque
+
+# Endpoints whose frequency control WeChat enforces per logged-in account
+ACCOUNT_ENDPOINTS = ("searchbiz", "appmsg")
+
+# Endpoint classes and their (initial rate/s, min rate, max rate, burst)
+ENDPOINT_LIMITS = {
+    "searchbiz": (0.3, 0.01, 1.0, 1),
+    "appmsg": (0.22, 0.01, 0.5, 1),     # Roughly the old 3-6 s sleep between listing pages
+    "article": (5.0, 0.2, 20.0, 4),
+    "image": (50.0, 2.0, 200.0, 16),
+}
+
+# AIMD tuning
+INCREASE_FRACTION = 0.05   # Each clean response adds 5% of the initial rate
+DECREASE_FACTOR = 0.5      # A freq-control response halves the rate
+BACKOFF_BASE = 15          # First penalty pause in seconds, doubled per consecutive throttle
+BACKOFF_MAX = 600
+RATE_WINDOW = 60           # Seconds used to compute the effective rate
+
+
+class AdaptiveBucket:
+    """
+    Token bucket (GCRA form) whose rate adapts AIMD-style: additive increase on clean
+    responses, multiplicative decrease plus an exponential pause on freq-control responses.
+    """
+
+    def __init__(self, rate, min_rate, max_rate, burst):
+        self.initial_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+
+        self._lock = threading.Lock()
+        self._tat = 0.0            # Theoretical arrival time of the next request
+        self._blocked_until = 0.0
+        self._strikes = 0
+        self._recent = deque()
+
+        self.requests = 0
+        self.throttle_events = 0
+        self.throttled_seconds = 0.0
+
+    def reserve(self, max_wait=None):
+        """
+        Reserve the next request slot. Returns how many seconds the caller must wait before sending,
+        or None (reserving nothing) if that wait would be longer than max_wait.
+        """
+        with self._lock:
+            now = time.monotonic()
+            interval = 1.0 / self.rate
+            tat = max(self._tat, now)
+            allowed_at = max(tat - (self.burst - 1) * interval, self._blocked_until)
+            wait = max(0.0, allowed_at - now)
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tat = max(tat, allowed_at) + interval
+
+            self.requests += 1
+            self.throttled_seconds += wait
+            self._recent.append(now + wait)
+            while self._recent and self._recent[0] < now - RATE_WINDOW:
+                self._recent.popleft()
+            return wait
+
+    def available_in(self):
+        """Seconds until a request could be sent, without reserving a slot."""
+        with self._lock:
+            now = time.monotonic()
+            interval = 1.0 / self.rate
+            allowed_at = max(max(self._tat, now) - (self.burst - 1) * interval, self._blocked_until)
+            return max(0.0, allowed_at - now)
+
+    def backing_off(self):
+        """True while the bucket is blocked after a throttling response."""
+        with self._lock:
+            return self._blocked_until > time.monotonic()
+
+    def acquire(self, max_wait=None):
+        """Reserve a slot and wait for it. Returns the wait, or None without waiting if it exceeds max_wait."""
+        wait = self.reserve(max_wait)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def succeeded(self):
+        with self._lock:
+            self._strikes = 0
+            self.rate = min(self.max_rate, self.rate + self.initial_rate * INCREASE_FRACTION)
+
+    def throttled(self):
+        """Record a freq-control response. Returns the penalty pause in seconds."""
+        with self._lock:
+            self._strikes += 1
+            self.throttle_events += 1
+            self.rate = max(self.min_rate, self.rate * DECREASE_FACTOR)
+            penalty = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (self._strikes - 1))
+            self._blocked_until = max(self._blocked_until, time.monotonic() + penalty)
+            return penalty
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            recent = sum(1 for t in self._recent if now - RATE_WINDOW <= t <= now)
+            return {
+                "rate": round(self.rate, 3),
+                "effective_rate": round(recent / RATE_WINDOW, 3),
+                "requests": self.requests,
+                "throttle_events": self.throttle_events,
+                "throttled_seconds": round(self.throttled_seconds, 1),
+                "blocked_for": round(max(0.0, self._blocked_until - now), 1)
+            }
+
+
+class RateLimiter:
+    """
+    Process-wide set of adaptive buckets: one per shared endpoint class (article, image) and,
+    for the endpoints WeChat limits per account (searchbiz, appmsg), one set per login token,
+    so every job using the same login shares that login's budget.
+    """
+
+    def __init__(self, limits=None):
+        self.limits = limits or ENDPOINT_LIMITS
+        self.buckets = {
+            name: AdaptiveBucket(*limit) for name, limit in self.limits.items() if name not in ACCOUNT_ENDPOINTS
+        }
+        self._logins = {}
+        self._lock = threading.Lock()
+
+    def login_buckets(self, token):
+        """The searchbiz/appmsg buckets of one login, created on first use and shared from then on."""
+        with self._lock:
+            buckets = self._logins.get(token)
+            if buckets is None:
+                buckets = self._logins[token] = {name: AdaptiveBucket(*self.limits[name]) for name in ACCOUNT_ENDPOINTS}
+            return buckets
+
+    def acquire(self, endpoint, max_wait=None):
+        return self.buckets[endpoint].acquire(max_wait)
+
+    def reserve(self, endpoint, max_wait=None):
+        return self.buckets[endpoint].reserve(max_wait)
+
+    def backing_off(self, endpoint):
+        return self.buckets[endpoint].backing_off()
+
+    def succeeded(self, endpoint):
+        self.buckets[endpoint].succeeded()
+
+    def throttled(self, endpoint):
+        return self.buckets[endpoint].throttled()
+
+    def record(self, endpoint, status_code):
+        """Feed an HTTP status back into the bucket: 429/503 count as throttling, 2xx as clean."""
+        if status_code in (429, 503):
+            return self.throttled(endpoint)
+        if 200 <= status_code < 300:
+            self.succeeded(endpoint)
+        return 0
+
+    def stats(self):
+        return {name: bucket.stats() for name, bucket in self.buckets.items()}
+
+
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+
+def shared_limiter():
+    """The limiter shared by every scraper in this process."""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter()
+        return _shared_limiter
@@ -0,0 +1,72 @@
+import os
+import sys
+import tempfile
+import unittest
+import urllib.request
+from urllib.error import HTTPError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import archive_server
+from archive_server import start_archive_server, static_servable, MAX_STATIC_FILE_SIZE
+
+
+class ArchiveServerTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="archive_server_test_")
+        self.server = start_archive_server(self.root, port=0, host="127.0.0.1")
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        for name in os.listdir(self.root):
+            os.remove(os.path.join(self.root, name))
+        os.rmdir(self.root)
+
+    def test_streams_archive_over_static_cap(self):
+        # Sparse file: over Streamlit's 200 MB static cap without writing 200 MB to disk
+        size = MAX_STATIC_FILE_SIZE + 1024 * 1024
+        path = os.path.join(self.root, "big_archive.zip")
+        with open(path, "wb") as f:
+            f.truncate(size)
+        self.assertFalse(static_servable(path))
+
+        url = f"{self.base_url}/big_archive.zip?name=%E8%96%AA%E7%81%AB%E4%BC%A0_articles.zip"
+        with urllib.request.urlopen(url) as response:
+            self.assertEqual(response.status, 200)
+            self.assertEqual(response.headers["Content-Type"], "application/zip")
+            self.assertEqual(int(response.headers["Content-Length"]), size)
+            self.assertIn("filename*=UTF-8''%E8%96%AA%E7%81%AB%E4%BC%A0_articles.zip",
+                          response.headers["Content-Disposition"])
+            received = 0
+            while True:
+                chunk = response.read(4 * 1024 * 1024)
+                if not chunk:
+                    break
+                received += len(chunk)
+        self.assertEqual(received, size)
+
+    def test_static_cap_is_checked(self):
+        path = os.path.join(self.root, "small.zip")
+        with open(path, "wb") as f:
+            f.write(b"PK" * 10)
+        self.assertTrue(static_servable(path))
+        original = archive_server.MAX_STATIC_FILE_SIZE
+        archive_server.MAX_STATIC_FILE_SIZE = 10
+        try:
+            self.assertFalse(static_servable(path))
+        finally:
+            archive_server.MAX_STATIC_FILE_SIZE = original
+
+    def test_only_archives_in_root_are_served(self):
+        with open(os.path.join(self.root, "notes.txt"), "w") as f:
+            f.write("x")
+        for path in ("/notes.txt", "/../archive_server.py", "/missing.zip", "/"):
+            with self.assertRaises(HTTPError) as ctx:
+                urllib.request.urlopen(self.base_url + path)
+            self.assertEqual(ctx.exception.code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
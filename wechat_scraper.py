@@ -1,34 +1,105 @@
-import requests
-import json
-import time
-import random
 import os
 import re
 import base64
 from datetime import datetime
-from bs4 import BeautifulSoup
 import threading
-from docx import Document
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from docx.shared import Inches
-from io import BytesIO
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
+from http_session import PooledSession, Deadline, DeadlineExceeded, DEFAULT_POLICIES, DEFAULT_POOL_MAXSIZE, DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
+from image_store import ImageStore
+from page_cache import PageCache
+from article_index import ArticleIndex
+from rate_limiter import shared_limiter
+from credential_pool import CredentialPool
+from auth_helper import remove_credentials
+from pdf_renderer import RendererPool, DocumentServer, DEFAULT_POOL_SIZE
+from article_model import parse_page, image_urls, build_article, needs_full_page
+from exporters import render_html, write_html, write_docx, AssetStore, ASSETS_DIR_NAME
+from image_normalizer import ImageNormalizer
+from metrics import StageMetrics, shared_metrics
+from download_manifest import DownloadManifest, OUTPUT_LAYOUT, output_path
+import progress_events as events
+from progress_events import ProgressEvent
+
+MP_BASE_URL = "https://mp.weixin.qq.com"
+ARTICLE_DEADLINE = 120  # Seconds for one article page and all its images, retries included
+PAGE_CACHE_TTL = 24 * 3600  # Online runs download cached pages again once they are older than this
+MAX_FREQ_RETRIES = 4  # Consecutive freq-control responses per login tolerated before giving up on a listing
+FREQ_CONTROL_RETS = (200013,)
+INVALID_SESSION_RETS = (200003, 200040)
+PDF_STREAM_CHUNK = 256 * 1024
+DRIVER_INSTALL_LOCK = threading.Lock()
 
 class WeChatScraper:
-    def __init__(self, cookie, token):
+    def __init__(self, cookie, token, pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT,
+                 image_store=None, parser=None, pdf_workers=DEFAULT_POOL_SIZE, article_index=None,
+                 rate_limiter=None, credentials=None, image_normalizer=None, docx_pool=None,
+                 html_assets=False, base_url=MP_BASE_URL, on_event=None, request_policies=None,
+                 article_deadline=ARTICLE_DEADLINE, page_cache=None, offline=False, overwrite=False):
         self.cookie = cookie
         self.token = token
+        # Timeouts, retries and hedging per endpoint class ('listing', 'article', 'image')
+        self.policies = dict(DEFAULT_POLICIES, **(request_policies or {}))
+        # Overall budget per article so one stalled fetch can't pin a worker; None disables it
+        self.article_deadline = article_deadline
+        # Sink for typed progress events (e.g. ProgressAggregator.emit); called from worker threads too
+        self.on_event = on_event
+        # Per-stage timers and counters of this scraper's job, rolled up into the process-wide totals
+        self.metrics = StageMetrics(parent=shared_metrics())
+        # Official account platform; overridden by the benchmark suite to point at its mock server
+        self.base_url = base_url
+        # BeautifulSoup backend; None picks lxml when available
+        self.parser = parser
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Cookie': cookie
         }
+        # One keep-alive pool shared by every worker thread using this scraper
+        self.session = PooledSession(
+            headers=self.headers,
+            pool_maxsize=pool_maxsize,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout
+        )
+        # Persistent cross-article image cache; pass image_store=False to disable
+        if image_store is None:
+            image_store = ImageStore()
+        self.image_store = image_store or None
+        # Adaptive per-endpoint pacing shared by every scraper and worker in the process
+        self.limiter = rate_limiter or shared_limiter()
+        # Logins used for searchbiz/appmsg; extra (cookie, token) pairs raise the listing budget
+        self.credentials = CredentialPool(credentials or [(cookie, token)], self.limiter)
+        # Persistent listing index for incremental syncs; pass article_index=False to disable
+        if article_index is None:
+            article_index = ArticleIndex()
+        self.article_index = article_index or None
+        # Per-output image downsizing / transcoding; pass image_normalizer=False to embed originals
+        if image_normalizer is None:
+            image_normalizer = ImageNormalizer()
+        self.image_normalizer = image_normalizer or None
+        # Optional DocxProcessPool: Word documents are then built in worker processes instead of this thread
+        self.docx_pool = docx_pool
+        # HTML bundle mode: images go once into a shared HTML/assets/ directory instead of inline Base64
+        self.html_assets = html_assets
+        self._asset_stores = {}
+        # Persistent cache of raw article pages for re-exports; pass page_cache=False to disable
+        if page_cache is None:
+            page_cache = PageCache()
+        self.page_cache = page_cache or None
+        # Re-export mode: accounts, listings, pages and images come only from the local index and caches
+        self.offline = offline
+        # Write outputs again even if they exist (e.g. after a converter change) instead of skipping them
+        self.overwrite = overwrite
         # Initialize driver path once
         self.driver_path = self._get_driver_path()
-        self.driver = None
-        self.driver_lock = threading.Lock()
+        # Headless Chrome renderers shared by all workers for PDF output
+        self.renderers = RendererPool(self._create_driver, size=pdf_workers)
+        self.documents = DocumentServer()
+        # Per-target-directory manifests of written outputs
+        self._manifests = {}
+        self._manifests_lock = threading.Lock()
 
     def _get_system_chrome_path(self):
         paths = [
@@ -44,44 +115,81 @@ class WeChatScraper:
         return None
 
     def _get_driver_path(self):
-        # We handle driver path in _get_driver logic now mostly, but kept for compatibility
+        # We handle driver path in _create_driver logic now mostly, but kept for compatibility
         return None 
 
-    def _get_driver(self):
-        if self.driver is None:
-            options = webdriver.ChromeOptions()
-            options.add_argument('--headless')
-            options.add_argument('--disable-gpu')
-            options.add_argument('--no-sandbox')
-            options.add_argument('--disable-dev-shm-usage')
-            
-            binary = self._get_system_chrome_path()
-            if binary:
-                options.binary_location = binary
+    def _create_driver(self):
+        """Start a new headless Chrome. Returns None if it cannot be started."""
+        driver = None
+        options = webdriver.ChromeOptions()
+        options.add_argument('--headless')
+        options.add_argument('--disable-gpu')
+        options.add_argument('--no-sandbox')
+        options.add_argument('--disable-dev-shm-usage')
+        
+        binary = self._get_system_chrome_path()
+        if binary:
+            options.binary_location = binary
+        
+        try:
+            service = None
+            if binary and "/usr/bin" in binary and os.path.exists("/usr/bin/chromedriver"):
+                service = Service("/usr/bin/chromedriver")
             
-            try:
-                service = None
-                if binary and "/usr/bin" in binary and os.path.exists("/usr/bin/chromedriver"):
-                    service = Service("/usr/bin/chromedriver")
-                
-                if not service:       
-                    try:
+            if not service:       
+                try:
+                    # Several pooled renderers may start at once; download the driver only once
+                    with DRIVER_INSTALL_LOCK:
                         driver_path = ChromeDriverManager().install()
-                        if "THIRD_PARTY_NOTICES" in driver_path:
-                            driver_path = os.path.join(os.path.dirname(driver_path), "chromedriver")
-                        os.chmod(driver_path, 0o755)
-                        service = Service(driver_path)
-                    except:
-                        pass
+                    if "THIRD_PARTY_NOTICES" in driver_path:
+                        driver_path = os.path.join(os.path.dirname(driver_path), "chromedriver")
+                    os.chmod(driver_path, 0o755)
+                    service = Service(driver_path)
+                except:
+                    pass
+            
+            if service:
+                driver = webdriver.Chrome(service=service, options=options)
+            else:
+                driver = webdriver.Chrome(options=options)
                 
-                if service:
-                    self.driver = webdriver.Chrome(service=service, options=options)
-                else:
-                    self.driver = webdriver.Chrome(options=options)
-                    
-            except Exception as e:
-                print(f"Error initializing driver: {e}")
-        return self.driver
+        except Exception as e:
+            print(f"Error initializing driver: {e}")
+        return driver
+
+    def close_driver(self):
+        """Quit all pooled Chrome renderers."""
+        self.renderers.close()
+        self.documents.close()
+
+    def rate_limit_stats(self):
+        """Current/effective rate and time spent throttled per endpoint class (listing classes per login)."""
+        stats = self.limiter.stats()
+        stats['logins'] = self.credentials.stats()
+        return stats
+
+    def renderer_stats(self):
+        """Size, running drivers, completed renders and restarts of the PDF renderer pool."""
+        return self.renderers.stats()
+
+    def close(self):
+        """Release the Chrome driver and all pooled connections."""
+        self.close_driver()
+        self.session.close()
+        if self.image_store is not None:
+            self.image_store.close()
+        if self.page_cache is not None:
+            self.page_cache.close()
+        if self.article_index is not None:
+            self.article_index.close()
+        with self._manifests_lock:
+            manifests = list(self._manifests.values())
+        for manifest in manifests:
+            manifest.close()
+
+    def connection_stats(self):
+        """Connection reuse counters of the shared HTTP pool."""
+        return self.session.stats()
 
     def log(self, message, callback=None):
         if callback:
@@ -89,9 +197,34 @@ class WeChatScraper:
         else:
             print(message)
 
-    def get_fakeid(self, name, callback=None):
-        """Search for the official account and get its fakeid."""
-        url = "https://mp.weixin.qq.com/cgi-bin/searchbiz"
+    def emit(self, kind, article=None, **fields):
+        """Send a typed progress event (see progress_events) to on_event. Safe to call from any thread."""
+        if self.on_event is not None:
+            self.on_event(ProgressEvent(kind, article, **fields))
+
+    def get_fakeid(self, name, callback=None, use_cache=True, stop=None):
+        """
+        Search for the official account and get its fakeid. Cached names skip the searchbiz request.
+        stop (threading.Event) cancels a pending rate-limit wait; the search then returns None.
+        """
+        if self.offline:
+            fakeid = self.article_index.cached_fakeid(name, ttl=float('inf')) if self.article_index is not None else None
+            if fakeid:
+                self.log(f"Found Account '{name}' (cached).", callback)
+                self.emit(events.ACCOUNT_FOUND, name=name, cached=True)
+            else:
+                self.log(f"Account '{name}' not found in the local index.", callback)
+                self.emit(events.ACCOUNT_NOT_FOUND, name=name)
+            return fakeid
+        
+        if use_cache and self.article_index is not None:
+            fakeid = self.article_index.cached_fakeid(name)
+            if fakeid:
+                self.log(f"Found Account '{name}' (cached).", callback)
+                self.emit(events.ACCOUNT_FOUND, name=name, cached=True)
+                return fakeid
+        
+        url = f"{self.base_url}/cgi-bin/searchbiz"
         params = {
             "action": "search_biz",
             "begin": 0,
@@ -105,345 +238,637 @@ class WeChatScraper:
         
         try:
             self.log(f"Searching for '{name}'...", callback)
-            response = requests.get(url, headers=self.headers, params=params)
-            data = response.json()
+            self.emit(events.SEARCH, name=name)
+            # A throttled or logged-out credential is skipped in favour of the next one in the pool
+            for _ in range(max(1, len(self.credentials))):
+                credential, data = self._account_get('searchbiz', url, params, callback, stop)
+                if credential is None:
+                    return None
+                if data.get('base_resp', {}).get('ret') not in FREQ_CONTROL_RETS + INVALID_SESSION_RETS:
+                    break
             
             if data.get('base_resp', {}).get('ret') != 0:
                 self.log(f"Error searching for account: {data}", callback)
                 return None
-                
+            
             for item in data.get('list', []):
                 if item['nickname'] == name:
+                    if self.article_index is not None:
+                        self.article_index.cache_fakeid(name, item['fakeid'])
+                    self.emit(events.ACCOUNT_FOUND, name=name, cached=False)
                     return item['fakeid']
             
             self.log(f"Account '{name}' not found.", callback)
+            self.emit(events.ACCOUNT_NOT_FOUND, name=name)
             return None
         except Exception as e:
             self.log(f"Exception in get_fakeid: {e}", callback)
+            self.emit(events.ERROR, message=f"Exception in get_fakeid: {e}")
             return None
 
-    def get_articles(self, fakeid, callback=None, date_range=None):
+    def _account_get(self, endpoint, url, params, callback=None, stop=None):
+        """
+        GET a per-account endpoint (searchbiz / appmsg) on the credential that can send soonest.
+        Freq control parks that credential; an invalid session takes it out of the pool.
+        Returns: (credential, json) or (None, None) if no usable login is left or stop was set while waiting.
+        """
+        with self.metrics.timer('throttle_wait'):
+            credential = self.credentials.acquire(endpoint, stop)
+        if stop is not None and stop.is_set():
+            return None, None
+        if credential is None:
+            self.log("❌ No valid login left. Please scan to log in again.", callback)
+            self.emit(events.ERROR, message="No valid login left")
+            return None, None
+        
+        stage = 'search' if endpoint == 'searchbiz' else 'listing'
+        params = dict(params, token=credential.token)
+        with self.metrics.timer(stage):
+            response = self.session.fetch(url, self.policies['listing'], params=params, headers={'Cookie': credential.cookie})
+            data = response.json()
+        self.metrics.count(f"requests_{stage}")
+        self.metrics.count(f"bytes_{stage}", len(response.content))
+        
+        ret = data.get('base_resp', {}).get('ret')
+        if ret in FREQ_CONTROL_RETS:
+            self.metrics.count("freq_control_retries")
+            penalty = self.credentials.throttled(credential, endpoint)
+            self.log(f"⚠️ Rate limit detected (freq control). Backing off {penalty} seconds... (login {credential.label})", callback)
+            self.emit(events.RATE_LIMITED, endpoint=endpoint, penalty=penalty, credential=credential.label)
+        elif ret in INVALID_SESSION_RETS:
+            self.credentials.invalidate(credential)
+            # Also forget it in the saved logins, so later jobs don't pick it up again
+            remove_credentials(credential.token)
+            self.log(f"Login {credential.label} expired, removed from pool.", callback)
+        elif ret == 0:
+            self.credentials.succeeded(credential, endpoint)
+        return credential, data
+
+    def resolve_fakeids(self, names, callback=None):
+        """
+        Resolve many account names at once. Cached names cost no request;
+        the rest are searched one by one, paced by the searchbiz rate limiter.
+        Returns: dict name -> fakeid (None if not found).
+        """
+        result = {}
+        searched = 0
+        for name in dict.fromkeys(names):
+            fakeid = self.article_index.cached_fakeid(name) if self.article_index is not None else None
+            if fakeid is None:
+                fakeid = self.get_fakeid(name, callback, use_cache=False)
+                searched += 1
+            result[name] = fakeid
+        self.log(f"Resolved {sum(1 for v in result.values() if v)}/{len(result)} accounts ({searched} searched).", callback)
+        return result
+
+    def get_articles(self, fakeid, callback=None, date_range=None, stop=None):
         """
         Fetch article list for the given fakeid.
         date_range: tuple (start_date, end_date) objects.
         """
-        url = "https://mp.weixin.qq.com/cgi-bin/appmsg"
+        return list(self.iter_articles(fakeid, callback, date_range, stop))
+
+    def iter_articles(self, fakeid, callback=None, date_range=None, stop=None):
+        """
+        Generator version of get_articles: yields each article as soon as its listing page arrives,
+        so downloads can start while later pages are still being fetched.
+        Paging only advances when the consumer asks for more, which gives natural backpressure.
+        In offline mode the listing comes from the index instead (articles with a cached page only).
+        Setting stop (threading.Event) ends the listing, also in the middle of a rate-limit back-off.
+        """
+        if self.offline:
+            yield from self._cached_articles(fakeid, callback, date_range)
+            return
+        
+        url = f"{self.base_url}/cgi-bin/appmsg"
         articles = []
         page = 0
         MAX_PAGES_ESTIMATE = 40 
         
         should_stop = False
+        freq_retries = 0
+        
+        # Incremental sync: once a page reaches an article from the last contiguous sync
+        # and the index already covers the requested range, the rest comes from the index.
+        index = self.article_index
+        known_oldest, known_complete = index.coverage(fakeid) if index else (None, False)
+        connected = False
+        from_index = False
+        reached_end = False
+        oldest_seen = None
         
-        while not should_stop:
-            self.log(f"Fetching page {page + 1}...", callback)
-            params = {
-                "token": self.token,
-                "lang": "zh_CN",
-                "f": "json",
-                "ajax": 1,
-                "action": "list_ex",
-                "begin": page * 5,
-                "count": 5,
-                "query": "",
-                "fakeid": fakeid,
-                "type": 9
-            }
+        try:
+            while not should_stop:
+                if stop is not None and stop.is_set():
+                    self.emit(events.LISTING_STOPPED, reason='cancelled', listed=len(articles))
+                    break
+                self.log(f"Fetching page {page + 1}...", callback)
+                self.emit(events.PAGE, page=page + 1, listed=len(articles))
+                params = {
+                    "token": self.token,
+                    "lang": "zh_CN",
+                    "f": "json",
+                    "ajax": 1,
+                    "action": "list_ex",
+                    "begin": page * 5,
+                    "count": 5,
+                    "query": "",
+                    "fakeid": fakeid,
+                    "type": 9
+                }
             
-            try:
-                response = requests.get(url, headers=self.headers, params=params)
-                data = response.json()
-                
-                if data.get('base_resp', {}).get('ret') == 200013:
-                    self.log("⚠️ Rate limit detected (freq control). Waiting 60 seconds...", callback)
-                    time.sleep(60)
-                    response = requests.get(url, headers=self.headers, params=params)
-                    data = response.json()
-                    if data.get('base_resp', {}).get('ret') != 0:
-                        self.log("❌ Rate limit persists. Please try again in 1-24 hours.", callback)
+                try:
+                    # Paced per credential instead of a fixed sleep between pages
+                    credential, data = self._account_get('appmsg', url, params, callback, stop)
+                    if credential is None:
+                        if stop is not None and stop.is_set():
+                            self.emit(events.LISTING_STOPPED, reason='cancelled', listed=len(articles))
+                        else:
+                            self.emit(events.LISTING_STOPPED, reason='no_login')
                         break
+                
+                    ret = data.get('base_resp', {}).get('ret')
+                    if ret in FREQ_CONTROL_RETS:
+                        freq_retries += 1
+                        if freq_retries > MAX_FREQ_RETRIES * len(self.credentials):
+                            self.log("❌ Rate limit persists. Please try again in 1-24 hours.", callback)
+                            self.emit(events.LISTING_STOPPED, reason='rate_limit')
+                            break
+                        continue # Retry the same page on the next available credential
+                
+                    if ret in INVALID_SESSION_RETS:
+                        continue
 
-                if data.get('base_resp', {}).get('ret') != 0:
-                    self.log(f"Error fetching articles: {data}", callback)
-                    break
+                    if ret != 0:
+                        self.log(f"Error fetching articles: {data}", callback)
+                        self.emit(events.LISTING_STOPPED, reason='error', ret=ret)
+                        break
+                
+                    freq_retries = 0
                     
-                msg_list = data.get('app_msg_list', [])
-                if not msg_list:
-                    self.log("No more articles found.", callback)
-                    break
+                    msg_list = data.get('app_msg_list', [])
+                    if not msg_list:
+                        self.log("No more articles found.", callback)
+                        self.emit(events.LISTING_STOPPED, reason='end', listed=len(articles))
+                        reached_end = True
+                        break
+                
+                    if index:
+                        if known_oldest is not None and not connected:
+                            connected = any(index.has(fakeid, msg['link']) for msg in msg_list)
+                        index.add(fakeid, msg_list)
+                        oldest_seen = msg_list[-1]['create_time']
                     
-                for msg in msg_list:
-                    create_time = datetime.fromtimestamp(msg['create_time'])
-                    date_str = create_time.strftime('%Y-%m-%d')
+                    for msg in msg_list:
+                        create_time = datetime.fromtimestamp(msg['create_time'])
+                        date_str = create_time.strftime('%Y-%m-%d')
                     
-                    # Date Filtering
-                    if date_range:
-                        start_date, end_date = date_range
-                        # Convert to date objects for comparison
-                        msg_date = create_time.date()
+                        # Date Filtering
+                        if date_range:
+                            start_date, end_date = date_range
+                            # Convert to date objects for comparison
+                            msg_date = create_time.date()
                         
-                        if msg_date < start_date:
-                            self.log(f"Reached articles older than {start_date}. Stopping.", callback)
-                            should_stop = True
-                            break
+                            if msg_date < start_date:
+                                self.log(f"Reached articles older than {start_date}. Stopping.", callback)
+                                self.emit(events.LISTING_STOPPED, reason='date_range', listed=len(articles))
+                                should_stop = True
+                                break
                         
-                        if msg_date > end_date:
-                            continue # Skip newer articles
+                            if msg_date > end_date:
+                                continue # Skip newer articles
                     
-                    article_info = {
-                        "title": msg['title'],
-                        "link": msg['link'],
-                        "create_time": msg['create_time'],
-                        "date_str": date_str,
-                        "digest": msg['digest']
-                    }
-                    articles.append(article_info)
+                        article_info = {
+                            "title": msg['title'],
+                            "link": msg['link'],
+                            "create_time": msg['create_time'],
+                            "date_str": date_str,
+                            "digest": msg['digest']
+                        }
+                        articles.append(article_info)
+                        yield article_info
                 
-                if should_stop:
-                    break
-                    
-                page += 1
-                
-                if page > MAX_PAGES_ESTIMATE:
-                    self.log("⚠️ Warning: Reached potential WeChat API limit (approx 200 articles). Older articles may not be accessible via this method.", callback)
+                    if should_stop:
+                        break
                 
-                time.sleep(random.randint(3, 6)) 
+                    if connected and index.covers(fakeid, date_range):
+                        self.log("Reached already indexed articles. Stopping.", callback)
+                        self.emit(events.LISTING_STOPPED, reason='indexed', listed=len(articles))
+                        from_index = True
+                        break
+                    
+                    page += 1
                 
-            except Exception as e:
-                self.log(f"Exception in get_articles: {e}", callback)
-                break
+                    if page > MAX_PAGES_ESTIMATE:
+                        self.log("⚠️ Warning: Reached potential WeChat API limit (approx 200 articles). Older articles may not be accessible via this method.", callback)
                 
+                except Exception as e:
+                    self.log(f"Exception in get_articles: {e}", callback)
+                    self.emit(events.LISTING_STOPPED, reason='error', message=str(e))
+                    break
+        
+        finally:
+            if index and oldest_seen is not None:
+                if connected:
+                    # This run joined the previously indexed range, so coverage only grows
+                    index.set_coverage(fakeid, min(known_oldest, oldest_seen), known_complete or reached_end)
+                else:
+                    index.set_coverage(fakeid, oldest_seen, reached_end)
+            elif index and reached_end and page == 0:
+                # Account without any articles
+                index.set_coverage(fakeid, 0, True)
+        
+        if from_index:
+            # Everything older than the connecting page is already known
+            listed = {article['link'] for article in articles}
+            for article_info in index.articles(fakeid, date_range):
+                if article_info['link'] not in listed:
+                    yield article_info
+
+    def _cached_articles(self, fakeid, callback=None, date_range=None):
+        """Indexed articles of fakeid whose raw page is in the page cache, newest first."""
+        articles = []
+        if self.article_index is not None and self.page_cache is not None:
+            articles = [article for article in self.article_index.articles(fakeid, date_range)
+                        if self.page_cache.has(article['link'])]
+        self.log(f"{len(articles)} cached articles (offline).", callback)
+        self.emit(events.LISTING_STOPPED, reason='cache', listed=len(articles))
         return articles
 
     def _clean_filename(self, title):
         return re.sub(r'[\\/*?:"<>|]', "", title)
 
-    def _convert_html_to_pdf_selenium(self, html_path, pdf_path):
-        """Convert HTML file to PDF using Selenium (Print to PDF)."""
-        # Lock driver usage to ensure thread safety
-        with self.driver_lock:
-            driver = self._get_driver()
-            if not driver:
-                return False
+    def _convert_html_content_to_pdf(self, html_content, pdf_path, asset_dir=None):
+        """
+        Convert an in-memory HTML document to PDF, served to Chrome over loopback instead of a temp file.
+        asset_dir is served alongside it for bundle-mode HTML that links its images.
+        """
+        with self.documents.serve(html_content, asset_dir) as url:
+            return self._print_to_pdf(url, pdf_path)
+
+    def _print_to_pdf(self, url, pdf_path):
+        # Each call checks out its own driver, so several PDFs render in parallel
+        try:
+            with self.renderers.renderer() as driver:
+                if not driver:
+                    return False
                 
-            try:
-                driver.get(f"file://{os.path.abspath(html_path)}")
+                driver.get(url)
                 
                 print_params = {
                     "landscape": False,
                     "displayHeaderFooter": False,
                     "printBackground": True,
                     "preferCSSPageSize": True,
+                    "transferMode": "ReturnAsStream",
                 }
                 
                 result = driver.execute_cdp_cmd("Page.printToPDF", print_params)
-                
-                with open(pdf_path, 'wb') as f:
-                    f.write(base64.b64decode(result['data']))
-                    
+                self._save_pdf_stream(driver, result['stream'], pdf_path)
                 return True
+        except Exception as e:
+            # The pool quits the crashed driver and starts a fresh one on next checkout
+            print(f"Selenium PDF Error: {e}")
+            return False
+
+    def _save_pdf_stream(self, driver, stream, pdf_path):
+        """
+        Copy a CDP IO stream to pdf_path chunk by chunk, so memory per render is bounded by PDF_STREAM_CHUNK.
+        Writes to a temp file first so a failed render never leaves a partial PDF that later runs would skip.
+        """
+        tmp_path = f"{pdf_path}.part"
+        try:
+            with open(tmp_path, 'wb') as f:
+                while True:
+                    chunk = driver.execute_cdp_cmd("IO.read", {"handle": stream, "size": PDF_STREAM_CHUNK})
+                    data = chunk.get('data', '')
+                    if data:
+                        f.write(base64.b64decode(data) if chunk.get('base64Encoded') else data.encode('latin-1'))
+                    if chunk.get('eof'):
+                        break
+            os.replace(tmp_path, pdf_path)
+        finally:
+            try:
+                driver.execute_cdp_cmd("IO.close", {"handle": stream})
+            except Exception:
+                pass
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _paced(self, endpoint, deadline=None):
+        """
+        before_send hook: wait for a rate-limit slot before every attempt, retries and hedges included.
+        A wait that would not end before deadline raises DeadlineExceeded at once, without taking the slot.
+        """
+        def before_send():
+            remaining = deadline.remaining() if deadline else None
+            wait = self.limiter.acquire(endpoint, remaining)
+            if wait is None:
+                raise DeadlineExceeded(f"Deadline exceeded waiting for a rate-limit slot ({endpoint})")
+            self.metrics.observe('throttle_wait', wait)
+        return before_send
+
+    def _backing_off(self, endpoint):
+        """backing_off hook: no hedges or retries while the endpoint is backing off after throttling."""
+        return lambda: self.limiter.backing_off(endpoint)
+
+    def _recorded(self, endpoint):
+        """after_response hook: every attempt's status reaches the adaptive limiter, retries included."""
+        return lambda response: self.limiter.record(endpoint, response.status_code)
+
+    def _cached_page(self, article):
+        """
+        Page text from the page cache, or None. Offline runs take any cached page; online runs only
+        recent ones, so an article edited or deleted since is picked up again.
+        """
+        if self.page_cache is None:
+            return None
+        page_html = self.page_cache.get(article['link'], None if self.offline else PAGE_CACHE_TTL)
+        if page_html is not None:
+            self.metrics.count("pages_cached")
+        return page_html
+
+    def _fetch_article_html(self, article, callback=None, deadline=None):
+        """Fetch the raw article page (recent page cache entry first). Returns the page text, or None on a bad status."""
+        page_html = self._cached_page(article)
+        if page_html is not None:
+            return page_html
+        if self.offline:
+            self.log(f"Not cached: {article['title']}", callback)
+            return None
+        
+        with self.metrics.timer('article_fetch'):
+            response = self.session.fetch(article['link'], self.policies['article'], deadline,
+                                          self._paced('article', deadline), self._backing_off('article'),
+                                          self._recorded('article'))
+            content = response.content
+        self.metrics.count("requests_article")
+        self.metrics.count("bytes_article", len(content))
+        response.encoding = 'utf-8'
+        
+        if response.status_code != 200:
+            self.log(f"Failed to download {article['title']}: Status {response.status_code}", callback)
+            return None
+        if self.page_cache is not None:
+            self.page_cache.put(article['link'], response.text)
+        return response.text
+
+    def _fetch_image_bytes(self, img_url, deadline=None):
+        """Fetch one image over the network. Returns the raw bytes, or None on a non-200 response."""
+        if self.offline:
+            # Images missing from the image store stay remote links, as failed downloads do
+            return None
+        with self.metrics.timer('image_fetch'):
+            img_resp = self.session.fetch(img_url, self.policies['image'], deadline,
+                                          self._paced('image', deadline), self._backing_off('image'),
+                                          self._recorded('image'))
+            content = img_resp.content
+        self.metrics.count("requests_image")
+        self.metrics.count("bytes_image", len(content))
+        if img_resp.status_code == 200:
+            return img_resp.content
+        return None
+
+    def _download_image(self, img_url, deadline=None):
+        """Image bytes for img_url, served from the shared image store when possible."""
+        if self.image_store is None:
+            return self._fetch_image_bytes(img_url, deadline)
+        return self.image_store.fetch(img_url, lambda url: self._fetch_image_bytes(url, deadline))
+
+    def image_normalizer_stats(self):
+        """Images transcoded/downscaled and bytes saved by normalization (None if disabled)."""
+        if self.image_normalizer is None:
+            return None
+        return self.image_normalizer.stats()
+
+    def image_store_stats(self):
+        """Hit/miss and bytes-saved counters of the image store (None if disabled)."""
+        if self.image_store is None:
+            return None
+        return self.image_store.stats()
+
+    def metrics_report(self):
+        """JSON-serializable report of this scraper's stage timings, counters and pool statistics."""
+        report = self.metrics.report()
+        report["connections"] = self.connection_stats()
+        report["rate_limits"] = self.rate_limit_stats()
+        report["renderers"] = self.renderer_stats()
+        report["image_store"] = self.image_store_stats()
+        report["page_cache"] = self.page_cache.stats() if self.page_cache is not None else None
+        report["images"] = self.image_normalizer_stats()
+        return report
+
+    def _fetch_images(self, urls, article=None, deadline=None):
+        """Fetch each distinct image once. Maps URL to bytes, None, or the exception raised."""
+        images = {}
+        total = len(set(urls))
+        for img_url in urls:
+            if img_url in images:
+                continue
+            try:
+                images[img_url] = self._download_image(img_url, deadline)
             except Exception as e:
-                print(f"Selenium PDF Error: {e}")
-                # If driver crashes, reset it
-                self.close_driver()
-                return False
+                images[img_url] = e
+            self.emit(events.IMAGE, article, done=len(images), total=total,
+                      ok=isinstance(images[img_url], bytes))
+        return images
+
+    def manifest(self, base_dir):
+        """The DownloadManifest of a target directory (one shared instance per directory)."""
+        key = os.path.abspath(base_dir)
+        with self._manifests_lock:
+            if key not in self._manifests:
+                self._manifests[key] = DownloadManifest(base_dir)
+            return self._manifests[key]
+
+    def asset_store(self, base_dir):
+        """The shared HTML/assets/ store of a target directory (bundle mode)."""
+        key = os.path.abspath(base_dir)
+        with self._manifests_lock:
+            if key not in self._asset_stores:
+                html_dir = os.path.join(base_dir, OUTPUT_LAYOUT['html'][0])
+                self._asset_stores[key] = AssetStore(os.path.join(html_dir, ASSETS_DIR_NAME))
+            return self._asset_stores[key]
+
+    def output_files(self, article, base_dir, formats):
+        """Paths of the article's outputs recorded in the target directory's manifest."""
+        manifest = self.manifest(base_dir)
+        paths = []
+        for fmt in formats:
+            path = manifest.lookup(article, fmt)
+            if path:
+                paths.append(path)
+        return paths
+
+    def _mark_downloaded(self, article, fmt, base_dir=None, filepath=None):
+        if base_dir is not None:
+            self.manifest(base_dir).record(article, fmt, filepath)
+        self.emit(events.FORMAT_DONE, article, format=fmt)
+
+    def _filename_base(self, article):
+        return f"{article['date_str']}_{self._clean_filename(article['title'])}"
+
+    def pending_formats(self, article, base_dir, formats, callback=None):
+        """
+        Formats that still have to be produced for article, decided without any network request.
+        Outputs found through the manifest under an older filename are renamed to the current one;
+        files already on disk but missing from the manifest (earlier runs) are adopted into it.
+        With overwrite every requested format is pending.
+        """
+        manifest = self.manifest(base_dir)
+        filename_base = self._filename_base(article)
+        pending = []
+        for fmt in formats:
+            if fmt not in OUTPUT_LAYOUT:
+                continue
+            if self.overwrite:
+                pending.append(fmt)
+                continue
+            label = OUTPUT_LAYOUT[fmt][0]
+            filepath = output_path(base_dir, fmt, filename_base)
+            known = manifest.lookup(article, fmt)
+            
+            if known and os.path.abspath(known) != os.path.abspath(filepath) and not os.path.exists(filepath):
+                try:
+                    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+                    os.replace(known, filepath)
+                    manifest.record(article, fmt, filepath)
+                    self.log(f"Skip {label} (Renamed): {os.path.basename(known)} -> {filename_base}", callback)
+                    continue
+                except OSError as e:
+                    self.log(f"Error renaming {known}: {e}", callback)
+            
+            if os.path.exists(filepath):
+                if not known:
+                    manifest.record(article, fmt, filepath)
+                self.log(f"Skip {label} (Exists): {filename_base}", callback)
+            elif known:
+                self.log(f"Skip {label} (Exists): {os.path.basename(known)}", callback)
+            else:
+                pending.append(fmt)
+        return pending
 
     def save_article_content(self, article, base_dir, formats=['html'], callback=None):
         """Download and save the article content in specified formats."""
-        title = article['title']
-        date_str = article['date_str']
-        safe_title = self._clean_filename(title)
-        filename_base = f"{date_str}_{safe_title}"
+        # Outputs recorded in the target directory's manifest are skipped before any network I/O
+        formats = self.pending_formats(article, base_dir, formats, callback)
+        if not formats:
+            self.emit(events.ARTICLE_SKIPPED, article)
+            return False
         
-        # Fetch content once
+        # Fetch and parse content once; every format is written from the same parsed article
+        self.emit(events.ARTICLE_START, article, formats=list(formats))
+        deadline = Deadline(self.article_deadline)
         try:
-            response = requests.get(article['link'], headers=self.headers)
-            response.encoding = 'utf-8'
-            
-            if response.status_code != 200:
-                self.log(f"Failed to download {title}: Status {response.status_code}", callback)
+            page_html = self._fetch_article_html(article, callback, deadline)
+            if page_html is None:
+                self.metrics.count("articles_failed")
+                self.emit(events.ARTICLE_DONE, article, success=False)
                 return False
             
-            # Process HTML for local viewing
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # 1. Add no-referrer meta tag to bypass anti-hotlinking
-            meta_tag = soup.new_tag('meta', attrs={"name": "referrer", "content": "no-referrer"})
-            if soup.head:
-                soup.head.insert(0, meta_tag)
-            else:
-                # Create head if missing
-                head = soup.new_tag('head')
-                head.insert(0, meta_tag)
-                soup.insert(0, head)
-                
-            # 2. Fix lazy-loaded images (Embed as Base64)
-            for img in soup.find_all('img'):
-                img_url = img.get('data-src') or img.get('src')
-                if img_url:
-                    try:
-                        # Download image
-                        img_resp = requests.get(img_url, headers=self.headers, timeout=10)
-                        if img_resp.status_code == 200:
-                            b64_data = base64.b64encode(img_resp.content).decode('utf-8')
-                            
-                            # Determine mime type
-                            mime_type = "image/jpeg"
-                            if "png" in img_url: mime_type = "image/png"
-                            elif "gif" in img_url: mime_type = "image/gif"
-                            elif "svg" in img_url: mime_type = "image/svg+xml"
-                            
-                            img['src'] = f"data:{mime_type};base64,{b64_data}"
-                            
-                            # Remove data-src to prevent lazy loading scripts from messing it up
-                            if 'data-src' in img.attrs: del img['data-src']
-                    except Exception as e:
-                        # Fallback: just use the URL if download fails
-                        if 'data-src' in img.attrs:
-                            img['src'] = img['data-src']
-                        print(f"Failed to embed image: {e}")
-                    
-            html_content = str(soup)
+            with self.metrics.timer('parse'):
+                soup = parse_page(page_html, self.parser, content_only=not needs_full_page(formats))
+                urls = image_urls(soup)
+            self.emit(events.ARTICLE_FETCHED, article, bytes=len(page_html), images=len(set(urls)))
+            images = self._fetch_images(urls, article, deadline)
+            with self.metrics.timer('parse'):
+                parsed = build_article(article, soup, images)
             
         except Exception as e:
-            self.log(f"Error downloading {title}: {e}", callback)
+            self.log(f"Error downloading {article['title']}: {e}", callback)
+            self.metrics.count("articles_failed")
+            self.emit(events.ARTICLE_DONE, article, success=False, error=str(e))
             return False
 
-        success = False
+        return self._write_outputs(article, base_dir, formats, parsed, callback)
 
-        # 1. HTML (Save if requested or needed for PDF)
-        save_dir_html = os.path.join(base_dir, "HTML")
-        html_filepath = os.path.join(save_dir_html, f"{filename_base}.html")
+    def _write_outputs(self, article, base_dir, formats, parsed, callback=None):
+        """Write the parsed article out in each requested format."""
+        filename_base = self._filename_base(article)
+        
+        # Images that could not be fetched are left out of every format; count them instead of failing silently
+        failed_images = sum(1 for data in parsed.images.values() if data is None or isinstance(data, BaseException))
+        self.metrics.count("images_fetched", len(parsed.images) - failed_images)
+        if failed_images:
+            self.metrics.count("images_failed", failed_images)
+            self.log(f"Images failed: {failed_images}/{len(parsed.images)} in {filename_base}", callback)
         
-        # Only write HTML to disk if user wants it OR if we need it for PDF generation
-        if 'html' in formats or 'pdf' in formats:
-            if not os.path.exists(save_dir_html): os.makedirs(save_dir_html)
+        # HTML is only built when an HTML-based format actually needs it; the shared assets/ directory
+        # belongs to the HTML output, so PDF-only jobs render from inline images and leave no HTML behind
+        assets = self.asset_store(base_dir) if self.html_assets and 'html' in formats else None
+        asset_dir = assets.assets_dir if assets else None
+        rendered = []
+        def html_content():
+            if not rendered:
+                with self.metrics.timer('html_render'):
+                    rendered.append(render_html(parsed, self.image_normalizer, assets))
+            return rendered[0]
+        
+        success = False
+
+        # 1. HTML (only written to disk when requested)
+        if 'html' in formats:
+            html_filepath = output_path(base_dir, 'html', filename_base)
+            os.makedirs(os.path.dirname(html_filepath), exist_ok=True)
             
-            if not os.path.exists(html_filepath):
-                with open(html_filepath, 'w', encoding='utf-8') as f:
-                    f.write(html_content)
-                if 'html' in formats: success = True
-            elif 'html' in formats:
+            if self.overwrite or not os.path.exists(html_filepath):
+                write_html(html_content(), html_filepath)
+                self._mark_downloaded(article, 'html', base_dir, html_filepath)
+                success = True
+            else:
                 self.log(f"Skip HTML (Exists): {filename_base}", callback)
                 success = True
 
-        # 2. PDF (Selenium)
+        # 2. PDF (Selenium, rendered straight from memory)
         if 'pdf' in formats:
-            save_dir_pdf = os.path.join(base_dir, "PDF")
-            if not os.path.exists(save_dir_pdf): os.makedirs(save_dir_pdf)
-            filepath = os.path.join(save_dir_pdf, f"{filename_base}.pdf")
+            filepath = output_path(base_dir, 'pdf', filename_base)
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
             
-            if not os.path.exists(filepath):
+            if self.overwrite or not os.path.exists(filepath):
                 try:
-                    # Ensure HTML exists for PDF generation
-                    if not os.path.exists(html_filepath):
-                         with open(html_filepath, 'w', encoding='utf-8') as f:
-                            f.write(html_content)
-
-                    pdf_success = self._convert_html_to_pdf_selenium(html_filepath, filepath)
+                    content = html_content()
+                    with self.metrics.timer('pdf_render'):
+                        pdf_success = self._convert_html_content_to_pdf(content, filepath, asset_dir)
                     if pdf_success:
+                        self._mark_downloaded(article, 'pdf', base_dir, filepath)
                         success = True
                     else:
+                        self.metrics.count("pdf_failed")
                         self.log(f"Error converting to PDF", callback)
+                        self.emit(events.FORMAT_FAILED, article, format='pdf', error=None)
                 except Exception as e:
+                    self.metrics.count("pdf_failed")
                     self.log(f"Error converting to PDF: {e}", callback)
+                    self.emit(events.FORMAT_FAILED, article, format='pdf', error=str(e))
             else:
                 self.log(f"Skip PDF (Exists): {filename_base}", callback)
 
-            # Cleanup HTML if not requested
-            if 'html' not in formats and os.path.exists(html_filepath):
-                try:
-                    os.remove(html_filepath)
-                    # Try to remove HTML dir if empty
-                    if not os.listdir(save_dir_html):
-                        os.rmdir(save_dir_html)
-                except:
-                    pass
-
         # 4. Word (Robust Text Extraction)
         if 'docx' in formats:
-            save_dir_word = os.path.join(base_dir, "Word")
-            if not os.path.exists(save_dir_word): os.makedirs(save_dir_word)
-            filepath = os.path.join(save_dir_word, f"{filename_base}.docx")
+            filepath = output_path(base_dir, 'docx', filename_base)
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
             
-            if not os.path.exists(filepath):
+            if self.overwrite or not os.path.exists(filepath):
                 try:
-                    doc = Document()
-                    doc.add_heading(title, 0)
-                    doc.add_paragraph(f"发布日期: {date_str}")
-                    
-                    soup = BeautifulSoup(html_content, 'html.parser')
-                    content_div = soup.find(id="js_content")
-                    
-                    if content_div:
-                        # Extract text paragraphs and headings and images
-                        for element in content_div.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'img']):
-                            # Handle Images
-                            if element.name == 'img':
-                                try:
-                                    img_url = element.get('data-src') or element.get('src')
-                                    if img_url:
-                                        # Handle Base64
-                                        if img_url.startswith('data:'):
-                                            try:
-                                                # Format: data:image/jpeg;base64,.....
-                                                header, encoded = img_url.split(',', 1)
-                                                img_data = base64.b64decode(encoded)
-                                                img_stream = BytesIO(img_data)
-                                                doc.add_picture(img_stream, width=Inches(5.5))
-                                            except Exception as e:
-                                                print(f"Error adding base64 image: {e}")
-                                        # Handle URL
-                                        else:
-                                            img_resp = requests.get(img_url, headers=self.headers, timeout=10)
-                                            if img_resp.status_code == 200:
-                                                img_stream = BytesIO(img_resp.content)
-                                                doc.add_picture(img_stream, width=Inches(5.5)) # Fit to page
-                                except Exception as e:
-                                    print(f"Error adding image: {e}")
-                            
-                            # Handle Text
-                            else:
-                                text = element.get_text(strip=True)
-                                if text:
-                                    if element.name.startswith('h'):
-                                        level = int(element.name[1])
-                                        doc.add_heading(text, level=level)
-                                    else:
-                                        doc.add_paragraph(text)
-                                        
-                                # Check for images inside paragraphs (common in WeChat)
-                                for img in element.find_all('img'):
-                                    try:
-                                        img_url = img.get('data-src') or img.get('src')
-                                        if img_url:
-                                            if img_url.startswith('data:'):
-                                                try:
-                                                    header, encoded = img_url.split(',', 1)
-                                                    img_data = base64.b64decode(encoded)
-                                                    img_stream = BytesIO(img_data)
-                                                    doc.add_picture(img_stream, width=Inches(5.5))
-                                                except Exception as e:
-                                                    print(f"Error adding inline base64 image: {e}")
-                                            else:
-                                                img_resp = requests.get(img_url, headers=self.headers, timeout=10)
-                                                if img_resp.status_code == 200:
-                                                    img_stream = BytesIO(img_resp.content)
-                                                    doc.add_picture(img_stream, width=Inches(5.5))
-                                    except Exception as e:
-                                        print(f"Error adding inline image: {e}")
-                    else:
-                        # Fallback if no js_content
-                        doc.add_paragraph("无法解析文章内容结构，仅保存纯文本。")
-                        doc.add_paragraph(soup.get_text())
-
-                    doc.save(filepath)
+                    with self.metrics.timer('docx_build'):
+                        if self.docx_pool is not None:
+                            embed_failed = self.docx_pool.write_docx(parsed, filepath, self.image_normalizer)
+                        else:
+                            embed_failed = write_docx(parsed, filepath, self.image_normalizer)
+                    if embed_failed:
+                        self.metrics.count("images_embed_failed", embed_failed)
+                    self._mark_downloaded(article, 'docx', base_dir, filepath)
                     success = True
                 except Exception as e:
+                    self.metrics.count("docx_failed")
                     self.log(f"Error converting to Word: {e}", callback)
+                    self.emit(events.FORMAT_FAILED, article, format='docx', error=str(e))
             else:
                 self.log(f"Skip Word (Exists): {filename_base}", callback)
 
         if success:
+            self.metrics.count("articles_downloaded")
             self.log(f"Downloaded: {filename_base}", callback)
+        self.emit(events.ARTICLE_DONE, article, success=success)
             
         return success